@@ -1,10 +1,9 @@
 from django.contrib import admin
-from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Count, Avg
-import csv
+from django.db.models import BinaryField, Count, Q
 import datetime
 
+from home import exports, skill_bits
 from home.models import Application, Profile, JobPost, Skill  # already registered below
 from .models import User, CandidateProfile, SavedSearch, SearchNotification
 
@@ -16,37 +15,31 @@ def export_as_csv(modeladmin, request, queryset):
     Includes concrete fields and many-to-many fields (as '; '-joined).
     """
     meta = modeladmin.model._meta
-    # Concrete fields (FKs will render via __str__)
-    field_names = [f.name for f in meta.fields]
+    # Concrete fields (FKs will render via __str__); raw bytes such as the
+    # skill_bits bitmasks aren't meant for a spreadsheet
+    fields = [f for f in meta.fields if not isinstance(f, BinaryField)]
+    field_names = [f.name for f in fields]
     # Many-to-many field names
     m2m_field_names = [f.name for f in meta.many_to_many]
 
-    # Prepare response
+    def rows():
+        # Related objects are joined, many-to-many values prefetched, per chunk
+        objects = queryset.select_related(*[f.name for f in fields if f.is_relation])
+        objects = objects.prefetch_related(None).prefetch_related(*m2m_field_names)
+        for chunk in exports.chunks(objects):
+            for obj in chunk:
+                row = []
+                # Concrete fields
+                for f in fields:
+                    val = getattr(obj, f.name)
+                    row.append("" if val is None else str(val))
+                # Many-to-many (render as '; '-joined)
+                for f in meta.many_to_many:
+                    row.append("; ".join(str(v) for v in getattr(obj, f.name).all()))
+                yield row
+
     filename = f"{meta.app_label}_{meta.model_name}_export.csv"
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-
-    # Header
-    writer.writerow(field_names + m2m_field_names)
-
-    # Rows
-    for obj in queryset:
-        row = []
-        # Concrete fields
-        for f in meta.fields:
-            val = getattr(obj, f.name)
-            row.append("" if val is None else str(val))
-        # Many-to-many (render as '; '-joined)
-        for f in meta.many_to_many:
-            try:
-                m2m_vals = getattr(obj, f.name).all()
-                row.append("; ".join(str(v) for v in m2m_vals))
-            except Exception:
-                row.append("")
-        writer.writerow(row)
-
-    return response
+    return exports.csv_response(filename, field_names + m2m_field_names, rows())
 
 
 # Make the action available in *all* admin changelists
@@ -55,201 +48,197 @@ admin.site.add_action(export_as_csv)
 
 # ---------- Enhanced Reporting Actions ----------
 
+def _salary_range(job):
+    if not (job.min_salary or job.max_salary):
+        return 'N/A'
+    min_sal = f"${job.min_salary:,.0f}" if job.min_salary else "N/A"
+    max_sal = f"${job.max_salary:,.0f}" if job.max_salary else "N/A"
+    return f"{min_sal} - {max_sal}"
+
+
 def export_user_activity_report(modeladmin, request, queryset):
     """Export detailed user activity report with application statistics"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="user_activity_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    # Applications this month
+    current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    writer = csv.writer(response)
-    writer.writerow([
+    def rows():
+        for chunk in exports.chunks(queryset.prefetch_related(None)):
+            user_ids = [user.id for user in chunk]
+            # Profiles and application counts for the whole chunk, a query each
+            profiles = {profile.user_id: profile for profile in Profile.objects.filter(user_id__in=user_ids).only(
+                'user_id', 'headline', 'latitude', 'longitude', 'commute_radius_miles', 'skill_bits')}
+            applications = {
+                applicant_id: (total, monthly) for applicant_id, total, monthly in
+                Application.objects.filter(applicant_id__in=user_ids).order_by().values_list('applicant_id').annotate(
+                    total=Count('id'), monthly=Count('id', filter=Q(applied_at__gte=current_month)))
+            }
+            
+            for user in chunk:
+                profile = profiles.get(user.id)
+                if profile is not None:
+                    skills_count = skill_bits.popcount(profile.skill_mask)
+                    location_set = bool(profile.latitude and profile.longitude)
+                    commute_radius = profile.commute_radius_miles
+                    profile_complete = bool(profile.headline and skills_count)
+                else:
+                    skills_count = 0
+                    location_set = False
+                    commute_radius = 'N/A'
+                    profile_complete = False
+                
+                total_applications, monthly_applications = applications.get(user.id, (0, 0))
+                
+                yield [
+                    user.username,
+                    user.email,
+                    user.get_role_display(),
+                    user.date_joined.strftime('%Y-%m-%d'),
+                    user.last_login.strftime('%Y-%m-%d %H:%M') if user.last_login else 'Never',
+                    'Yes' if user.is_active else 'No',
+                    total_applications,
+                    monthly_applications,
+                    'Yes' if profile_complete else 'No',
+                    skills_count,
+                    'Yes' if location_set else 'No',
+                    commute_radius
+                ]
+    
+    return exports.csv_response(exports.timestamped('user_activity_report'), [
         'Username', 'Email', 'Role', 'Date Joined', 'Last Login', 'Is Active',
         'Total Applications', 'Applications This Month', 'Profile Complete',
         'Skills Count', 'Location Set', 'Commute Radius'
-    ])
-    
-    for user in queryset:
-        try:
-            profile = Profile.objects.get(user=user)
-            skills_count = profile.skills.count()
-            location_set = bool(profile.latitude and profile.longitude)
-            commute_radius = profile.commute_radius_miles
-            profile_complete = bool(profile.headline and profile.skills.exists())
-        except Profile.DoesNotExist:
-            skills_count = 0
-            location_set = False
-            commute_radius = 'N/A'
-            profile_complete = False
-        
-        total_applications = Application.objects.filter(applicant=user).count()
-        
-        # Applications this month
-        current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_applications = Application.objects.filter(
-            applicant=user,
-            applied_at__gte=current_month
-        ).count()
-        
-        writer.writerow([
-            user.username,
-            user.email,
-            user.get_role_display(),
-            user.date_joined.strftime('%Y-%m-%d'),
-            user.last_login.strftime('%Y-%m-%d %H:%M') if user.last_login else 'Never',
-            'Yes' if user.is_active else 'No',
-            total_applications,
-            monthly_applications,
-            'Yes' if profile_complete else 'No',
-            skills_count,
-            'Yes' if location_set else 'No',
-            commute_radius
-        ])
-    
-    return response
+    ], rows())
 
 export_user_activity_report.short_description = "Export User Activity Report"
 
 def export_job_analytics_report(modeladmin, request, queryset):
     """Export job posting analytics with application statistics"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="job_analytics_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    # Applications this week
+    week_ago = timezone.now() - datetime.timedelta(days=7)
     
-    writer = csv.writer(response)
-    writer.writerow([
+    def rows():
+        jobs = queryset.select_related('created_by').prefetch_related(None).prefetch_related('skills')
+        for chunk in exports.chunks(jobs):
+            # Application counts for the whole chunk in one query
+            applications = {
+                job_id: (total, weekly) for job_id, total, weekly in
+                Application.objects.filter(job_id__in=[job.id for job in chunk]).order_by().values_list('job_id').annotate(
+                    total=Count('id'), weekly=Count('id', filter=Q(applied_at__gte=week_ago)))
+            }
+            
+            for job in chunk:
+                applications_count, weekly_applications = applications.get(job.id, (0, 0))
+                
+                # Skills
+                skills = ', '.join([skill.name for skill in job.skills.all()])
+                
+                # Days since posted
+                days_posted = (timezone.now().date() - job.created_at.date()).days
+                
+                yield [
+                    job.id,
+                    job.title,
+                    job.created_by.username,
+                    job.location or 'Not specified',
+                    'Yes' if job.remote else 'No',
+                    _salary_range(job),
+                    job.created_at.strftime('%Y-%m-%d'),
+                    applications_count,
+                    weekly_applications,
+                    skills or 'None specified',
+                    'Yes' if job.visa_sponsorship else 'No',
+                    'Yes' if job.approved else 'No',
+                    days_posted
+                ]
+    
+    return exports.csv_response(exports.timestamped('job_analytics_report'), [
         'Job ID', 'Title', 'Company/Creator', 'Location', 'Remote', 'Salary Range',
         'Posted Date', 'Total Applications', 'Applications This Week', 
         'Skills Required', 'Visa Sponsorship', 'Approved', 'Days Since Posted'
-    ])
-    
-    for job in queryset:
-        applications_count = job.applications.count()
-        
-        # Applications this week
-        week_ago = timezone.now() - datetime.timedelta(days=7)
-        weekly_applications = job.applications.filter(applied_at__gte=week_ago).count()
-        
-        # Skills
-        skills = ', '.join([skill.name for skill in job.skills.all()])
-        
-        # Salary range
-        salary_range = 'N/A'
-        if job.min_salary or job.max_salary:
-            min_sal = f"${job.min_salary:,.0f}" if job.min_salary else "N/A"
-            max_sal = f"${job.max_salary:,.0f}" if job.max_salary else "N/A"
-            salary_range = f"{min_sal} - {max_sal}"
-        
-        # Days since posted
-        days_posted = (timezone.now().date() - job.created_at.date()).days
-        
-        writer.writerow([
-            job.id,
-            job.title,
-            job.created_by.username,
-            job.location or 'Not specified',
-            'Yes' if job.remote else 'No',
-            salary_range,
-            job.created_at.strftime('%Y-%m-%d'),
-            applications_count,
-            weekly_applications,
-            skills or 'None specified',
-            'Yes' if job.visa_sponsorship else 'No',
-            'Yes' if job.approved else 'No',
-            days_posted
-        ])
-    
-    return response
+    ], rows())
 
 export_job_analytics_report.short_description = "Export Job Analytics Report"
 
 def export_application_tracking_report(modeladmin, request, queryset):
     """Export detailed application tracking report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="application_tracking_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
     
-    writer = csv.writer(response)
-    writer.writerow([
+    def rows():
+        # The job, its creator and the applicant come joined in each chunk
+        applications = queryset.select_related('job__created_by', 'applicant').prefetch_related(None)
+        for chunk in exports.chunks(applications):
+            for app in chunk:
+                # Days in current status
+                days_in_status = (timezone.now().date() - app.status_updated_at.date()).days
+                job = app.job
+                
+                yield [
+                    app.id,
+                    job.title,
+                    job.created_by.username,
+                    app.applicant.username if app.applicant else 'Anonymous',
+                    app.applicant.email if app.applicant else 'N/A',
+                    app.applied_at.strftime('%Y-%m-%d %H:%M'),
+                    app.get_status_display(),
+                    app.status_updated_at.strftime('%Y-%m-%d %H:%M'),
+                    days_in_status,
+                    'Yes' if app.note.strip() else 'No',
+                    job.location or 'Not specified',
+                    'Yes' if job.remote else 'No',
+                    _salary_range(job)
+                ]
+    
+    return exports.csv_response(exports.timestamped('application_tracking_report'), [
         'Application ID', 'Job Title', 'Company', 'Applicant Username', 'Applicant Email',
         'Application Date', 'Status', 'Status Updated', 'Days in Current Status',
         'Has Note', 'Job Location', 'Job Remote', 'Job Salary Range'
-    ])
-    
-    for app in queryset:
-        # Days in current status
-        days_in_status = (timezone.now().date() - app.status_updated_at.date()).days
-        
-        # Job salary info
-        job = app.job
-        salary_range = 'N/A'
-        if job.min_salary or job.max_salary:
-            min_sal = f"${job.min_salary:,.0f}" if job.min_salary else "N/A"
-            max_sal = f"${job.max_salary:,.0f}" if job.max_salary else "N/A"
-            salary_range = f"{min_sal} - {max_sal}"
-        
-        writer.writerow([
-            app.id,
-            job.title,
-            job.created_by.username,
-            app.applicant.username if app.applicant else 'Anonymous',
-            app.applicant.email if app.applicant else 'N/A',
-            app.applied_at.strftime('%Y-%m-%d %H:%M'),
-            app.get_status_display(),
-            app.status_updated_at.strftime('%Y-%m-%d %H:%M'),
-            days_in_status,
-            'Yes' if app.note.strip() else 'No',
-            job.location or 'Not specified',
-            'Yes' if job.remote else 'No',
-            salary_range
-        ])
-    
-    return response
+    ], rows())
 
 export_application_tracking_report.short_description = "Export Application Tracking Report"
 
 def export_platform_usage_summary(modeladmin, request, queryset):
     """Export platform usage summary with key metrics"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="platform_usage_summary_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Overall platform metrics
-    total_users = User.objects.count()
-    seekers = User.objects.filter(role='seeker').count()
-    recruiters = User.objects.filter(role='recruiter').count()
-    active_users = User.objects.filter(is_active=True).count()
-    
-    total_jobs = JobPost.objects.count()
-    active_jobs = JobPost.objects.filter(approved=True).count()
-    remote_jobs = JobPost.objects.filter(remote=True).count()
-    
-    total_applications = Application.objects.count()
-    
-    # Write summary metrics
-    writer.writerow(['Platform Usage Summary', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-    writer.writerow([])
-    writer.writerow(['Metric', 'Value'])
-    writer.writerow(['Total Users', total_users])
-    writer.writerow(['Job Seekers', seekers])
-    writer.writerow(['Recruiters', recruiters])
-    writer.writerow(['Active Users', active_users])
-    writer.writerow(['Total Job Posts', total_jobs])
-    writer.writerow(['Active Job Posts', active_jobs])
-    writer.writerow(['Remote Jobs', remote_jobs])
-    writer.writerow(['Total Applications', total_applications])
     
-    # Skills demand analysis
-    writer.writerow([])
-    writer.writerow(['Top Skills in Demand'])
-    writer.writerow(['Skill', 'Job Posts Requiring', 'Users with Skill'])
-    
-    skills_data = Skill.objects.annotate(
-        job_count=Count('jobs'),
-        user_count=Count('profile')
-    ).order_by('-job_count')[:10]
-    
-    for skill in skills_data:
-        writer.writerow([skill.name, skill.job_count, skill.user_count])
+    def rows():
+        # Overall platform metrics
+        users = User.objects.aggregate(
+            total=Count('id'),
+            seekers=Count('id', filter=Q(role='seeker')),
+            recruiters=Count('id', filter=Q(role='recruiter')),
+            active=Count('id', filter=Q(is_active=True)),
+        )
+        jobs = JobPost.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(approved=True)),
+            remote=Count('id', filter=Q(remote=True)),
+        )
+        
+        # Write summary metrics
+        yield ['Platform Usage Summary', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}']
+        yield []
+        yield ['Metric', 'Value']
+        yield ['Total Users', users['total']]
+        yield ['Job Seekers', users['seekers']]
+        yield ['Recruiters', users['recruiters']]
+        yield ['Active Users', users['active']]
+        yield ['Total Job Posts', jobs['total']]
+        yield ['Active Job Posts', jobs['active']]
+        yield ['Remote Jobs', jobs['remote']]
+        yield ['Total Applications', Application.objects.count()]
+        
+        # Skills demand analysis
+        yield []
+        yield ['Top Skills in Demand']
+        yield ['Skill', 'Job Posts Requiring', 'Users with Skill']
+        
+        skills_data = Skill.objects.annotate(
+            job_count=Count('jobs'),
+            user_count=Count('profile')
+        ).order_by('-job_count')[:10]
+        
+        for skill in skills_data:
+            yield [skill.name, skill.job_count, skill.user_count]
     
-    return response
+    return exports.csv_response(exports.timestamped('platform_usage_summary'), None, rows())
 
 export_platform_usage_summary.short_description = "Export Platform Usage Summary"
 
@@ -308,12 +297,8 @@ class ProfileAdmin(admin.ModelAdmin):
     list_filter = ("profile_visible", "show_headline", "show_skills", "updated_at")
     filter_horizontal = ("skills",)
     
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.prefetch_related('skills')
-    
     def skills_count(self, obj):
-        return obj.skills.count()
+        return skill_bits.popcount(obj.skill_mask)
     skills_count.short_description = 'Skills'
     
     def location_set(self, obj):
@@ -0,0 +1,117 @@
+"""
+Per-user unread counters for the nav-bar badges: unread messages and
+unread saved-search notifications.
+
+The counts live in the cache, one integer per user and kind, and are
+adjusted in place as messages and notifications are created or read. A
+missing count is recomputed from the database on the next read, so when
+in doubt a writer invalidates rather than adjusts.
+
+Counts expire after BADGE_CACHE_TTL seconds: with the default per-process
+cache, an adjustment only reaches the process that made it, and the others
+catch up once their copy expires. With a shared cache (JOBFINDER_CACHE_DIR)
+the reconcile_badges command can also correct drift periodically.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Conversation, SearchNotification
+
+KINDS = ("messages", "notifications")
+
+
+def _key(kind, user_id):
+    return f"accounts:badges:{kind}:{user_id}"
+
+
+def _from_db(kind, user_id):
+    if kind == "messages":
+        # Each conversation already counts what is unread for either side (see accounts.inbox)
+        totals = Conversation.objects.filter(Q(recruiter_id=user_id) | Q(candidate_id=user_id)).aggregate(
+            recruiter=Sum("recruiter_unread", filter=Q(recruiter_id=user_id)),
+            candidate=Sum("candidate_unread", filter=Q(candidate_id=user_id)),
+        )
+        return (totals["recruiter"] or 0) + (totals["candidate"] or 0)
+    return SearchNotification.objects.filter(saved_search__recruiter_id=user_id, is_read=False).count()
+
+
+def _ttl():
+    return getattr(settings, "BADGE_CACHE_TTL", 60)
+
+
+def counts(user):
+    """{"messages": n, "notifications": n} for the user, one cache lookup when warm"""
+    keys = {kind: _key(kind, user.id) for kind in KINDS}
+    cached = cache.get_many(keys.values())
+    result = {}
+    for kind, key in keys.items():
+        if key not in cached:
+            cached[key] = _from_db(kind, user.id)
+            cache.set(key, cached[key], _ttl())
+        # A decrement racing a recount can briefly overshoot
+        result[kind] = max(cached[key], 0)
+    return result
+
+
+def _adjust(kind, user_id, delta):
+    try:
+        if delta > 0:
+            cache.incr(_key(kind, user_id), delta)
+        elif delta < 0:
+            cache.decr(_key(kind, user_id), -delta)
+    except ValueError:
+        pass  # Not cached; read from the database next time
+
+
+def adjust(kind, user_ids, delta):
+    """Add delta to the users' counts of kind once the current transaction commits"""
+    user_ids = list(user_ids)
+
+    def apply():
+        for user_id in user_ids:
+            _adjust(kind, user_id, delta)
+
+    transaction.on_commit(apply)
+
+
+def invalidate(user_ids, kinds=KINDS):
+    """Drop the users' counts once the current transaction commits; they are recomputed on read"""
+    keys = [_key(kind, user_id) for user_id in user_ids for kind in kinds]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _all_from_db(user_ids):
+    """{(kind, user id): count} for the users, in three grouped queries"""
+    found = {(kind, user_id): 0 for kind in KINDS for user_id in user_ids}
+    for role in ("recruiter", "candidate"):
+        rows = (
+            Conversation.objects.filter(**{f"{role}_id__in": user_ids}, **{f"{role}_unread__gt": 0})
+            .order_by()
+            .values_list(f"{role}_id")
+            .annotate(total=Sum(f"{role}_unread"))
+        )
+        for user_id, total in rows:
+            found["messages", user_id] += total
+    rows = (
+        SearchNotification.objects.filter(saved_search__recruiter_id__in=user_ids, is_read=False)
+        .order_by()
+        .values_list("saved_search__recruiter_id")
+        .annotate(total=Count("id"))
+    )
+    for user_id, total in rows:
+        found["notifications", user_id] = total
+    return found
+
+
+def reconcile(user_ids):
+    """
+    Recompute the users' cached counts from the database. Returns the
+    number of counts that had been cached with a wrong value.
+    """
+    user_ids = list(user_ids)
+    actual = {_key(kind, user_id): count for (kind, user_id), count in _all_from_db(user_ids).items()}
+    cached = cache.get_many(actual.keys())
+    cache.set_many(actual, _ttl())
+    return sum(1 for key, count in cached.items() if actual[key] != count)
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import badges
+
+
+def unread_badges(request):
+    """
+    unread_badges.messages and unread_badges.notifications for the signed-in
+    user, looked up only when a template uses them
+    """
+    def counts():
+        user = request.user
+        return badges.counts(user) if user.is_authenticated else dict.fromkeys(badges.KINDS, 0)
+
+    return {"unread_badges": SimpleLazyObject(counts)}
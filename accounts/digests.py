@@ -0,0 +1,90 @@
+"""
+Notification digests: saved-search matches are buffered as PendingMatch
+rows and periodically flushed into one SearchNotification per search, so
+no match is dropped and recruiters aren't flooded.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from home import task_queue
+
+from . import badges
+from .models import PendingMatch, SavedSearch, SearchNotification
+
+FLUSH_TASK = "accounts.flush_digests"
+
+
+def _chunks(items, size=500):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def add_pending(pairs):
+    """Buffer (saved search id, profile id) matches without scheduling a flush"""
+    PendingMatch.objects.bulk_create(
+        [PendingMatch(saved_search_id=search_id, profile_id=profile_id) for search_id, profile_id in pairs],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+
+
+def buffer_matches(pairs):
+    """
+    Buffer (saved search id, profile id) matches and make sure a flush is
+    scheduled within NOTIFICATION_DIGEST_INTERVAL seconds
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    add_pending(pairs)
+    # One pending flush at a time; later matches ride along with it
+    task_queue.enqueue(FLUSH_TASK, key=FLUSH_TASK,
+                       delay=getattr(settings, "NOTIFICATION_DIGEST_INTERVAL", 900))
+
+
+def _message(name, usernames):
+    if len(usernames) == 1:
+        return f"New candidate {usernames[0]} matches your '{name}' search"
+    return f"{len(usernames)} new candidates match your '{name}' search"
+
+
+def flush():
+    """
+    Turn the buffered matches into one notification per saved search.
+    Returns the number of notifications created.
+    """
+    with transaction.atomic():
+        rows = list(
+            PendingMatch.objects.select_for_update()
+            .order_by("saved_search_id", "id")
+            .values_list("id", "saved_search_id", "saved_search__name",
+                         "saved_search__recruiter_id", "profile__user__username")
+        )
+        if not rows:
+            return 0
+
+        grouped = {}
+        for _, search_id, name, recruiter_id, username in rows:
+            grouped.setdefault((search_id, name, recruiter_id), []).append(username)
+
+        now = timezone.now()
+        SearchNotification.objects.bulk_create([
+            SearchNotification(saved_search_id=search_id, message=_message(name, usernames))
+            for (search_id, name, _), usernames in grouped.items()
+        ])
+        # Update last notified timestamps
+        SavedSearch.objects.bulk_update(
+            [SavedSearch(id=search_id, last_notified_at=now, updated_at=now) for search_id, _, _ in grouped],
+            ["last_notified_at", "updated_at"],
+            batch_size=500,
+        )
+        for chunk in _chunks([row[0] for row in rows]):
+            PendingMatch.objects.filter(id__in=chunk).delete()
+
+        for recruiter_id, count in Counter(recruiter_id for _, _, recruiter_id in grouped).items():
+            badges.adjust("notifications", [recruiter_id], count)
+    return len(grouped)
+
@@ -94,6 +94,7 @@ class CandidateSearchForm(forms.Form):
     projects_contains = forms.CharField(   # still named projects_contains for compatibility
         required=False,
         label="Projects/Experience contains",  # ✅ updated label
+        help_text="Comma-separated keywords, all required; separate alternatives with OR",
         widget=forms.TextInput(attrs={"class": "form-control"})
     )
 
@@ -152,7 +153,7 @@ class SavedSearchForm(forms.ModelForm):
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
         help_texts = {
-            'headline_keywords': 'Comma-separated keywords to search in candidate headlines',
-            'education_keywords': 'Comma-separated keywords to search in education fields',
-            'experience_keywords': 'Comma-separated keywords to search in work experience',
+            'headline_keywords': 'Comma-separated keywords candidates need in their headline; separate alternatives with OR',
+            'education_keywords': 'Comma-separated keywords candidates need in their education; separate alternatives with OR',
+            'experience_keywords': 'Comma-separated keywords candidates need in their work experience; separate alternatives with OR',
         }
\ No newline at end of file
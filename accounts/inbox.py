@@ -0,0 +1,99 @@
+"""
+Denormalized conversation state for the inbox: the latest message's time
+and preview, and each participant's unread count, kept on Conversation so
+the conversation list is read in one query.
+
+A message is unread for every participant other than its sender until its
+read_at is set, as in Conversation.get_unread_count_for_user.
+"""
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Left
+from django.utils import timezone
+
+from . import badges
+from .models import Conversation, Message
+
+PREVIEW_LENGTH = Conversation._meta.get_field("last_message_preview").max_length
+
+
+def _unread_change(sender_id, delta):
+    """Counter updates for a message by sender_id becoming (un)read"""
+    return {
+        f"{role}_unread": Case(
+            When(**{f"{role}_id": sender_id}, then=F(f"{role}_unread")),
+            default=F(f"{role}_unread") + delta,
+        )
+        for role in ("recruiter", "candidate")
+    }
+
+
+def _recipients(message):
+    conversation = message.conversation
+    return [user_id for user_id in (conversation.recruiter_id, conversation.candidate_id)
+            if user_id != message.sender_id]
+
+
+def message_sent(message):
+    """A new message is the latest one and unread for the other participant"""
+    Conversation.objects.filter(id=message.conversation_id).update(
+        last_message_at=message.created_at,
+        last_message_preview=message.content[:PREVIEW_LENGTH],
+        updated_at=timezone.now(),
+        **_unread_change(message.sender_id, 1),
+    )
+    badges.adjust("messages", _recipients(message), 1)
+
+
+def message_read(message):
+    """Call once per message whose read_at was just set"""
+    Conversation.objects.filter(id=message.conversation_id).update(**_unread_change(message.sender_id, -1))
+    badges.adjust("messages", _recipients(message), -1)
+
+
+def mark_read(conversation, reader):
+    """
+    Mark everything the other participant sent as read, with one UPDATE
+    for the messages and one for the counters. Returns how many were marked.
+    """
+    marked = (
+        Message.objects.filter(conversation=conversation, read_at__isnull=True)
+        .exclude(sender=reader)
+        .update(read_at=timezone.now())
+    )
+    if marked:
+        # Subtracted rather than zeroed, so a message sent meanwhile still
+        # counts; the other participant's unread messages didn't change
+        role = "recruiter" if reader.id == conversation.recruiter_id else "candidate"
+        Conversation.objects.filter(id=conversation.id).update(
+            **{f"{role}_unread": Greatest(F(f"{role}_unread") - marked, 0)})
+        badges.adjust("messages", [reader.id], -marked)
+    return marked
+
+
+def _unread_for(role):
+    unread = (
+        Message.objects.filter(conversation=OuterRef("pk"), read_at__isnull=True)
+        .exclude(sender=OuterRef(f"{role}_id"))
+        .order_by()
+        .values("conversation")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(unread), 0)
+
+
+def refresh(conversation_ids):
+    """Recompute the denormalized fields of the given conversations from their messages"""
+    conversations = Conversation.objects.filter(id__in=list(conversation_ids))
+    badges.invalidate(
+        {user_id for pair in conversations.values_list("recruiter_id", "candidate_id") for user_id in pair},
+        kinds=["messages"],
+    )
+    latest = Message.objects.filter(conversation=OuterRef("pk")).order_by("-created_at", "-id")
+    conversations.update(
+        last_message_at=Subquery(latest.values("created_at")[:1]),
+        last_message_preview=Coalesce(Left(Subquery(latest.values("content")[:1]), PREVIEW_LENGTH), Value("")),
+        recruiter_unread=_unread_for("recruiter"),
+        candidate_unread=_unread_for("candidate"),
+    )
+
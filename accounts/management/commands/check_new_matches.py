@@ -1,55 +1,126 @@
+import multiprocessing
+import os
+import time
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from accounts.models import SavedSearch, SearchNotification
+from django.db import connections, transaction
+from accounts import digests, matching, percolator
+from accounts.models import MatchCheckpoint, SavedSearch
+from home import skill_bits
 from home.models import Profile
 
+CHECKPOINT = 'check_new_matches'
+
 
 class Command(BaseCommand):
     help = 'Check for new candidate matches and send notifications to recruiters'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 evaluates in this process)')
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Saved searches evaluated per task')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report matches and timings without writing anything')
+
     def handle(self, *args, **options):
-        """Check all active saved searches for new matches"""
+        """Check all active saved searches against the profiles changed since the last run"""
+        timings = {}
+        started = time.monotonic()
+        if options['dry_run']:
+            checkpoint = MatchCheckpoint.objects.filter(name=CHECKPOINT).first() or MatchCheckpoint(name=CHECKPOINT)
+        else:
+            checkpoint, _ = MatchCheckpoint.objects.get_or_create(name=CHECKPOINT)
+        
+        # Only profiles changed since the high-water mark can be new matches
+        changed = Profile.objects.filter(profile_visible=True)
+        if checkpoint.position:
+            changed = changed.filter(updated_at__gt=checkpoint.position)
+        profiles = self.profile_rows(changed)
+        high_water = max((updated_at for _, _, _, updated_at in profiles), default=checkpoint.position)
         
         # Get all active saved searches with notifications enabled
-        active_searches = SavedSearch.objects.filter(
-            is_active=True,
-            notify_on_new_matches=True
-        )
+        _, criteria = percolator.build_index()
+        searches = {
+            search['id']: search for search in SavedSearch.objects.filter(id__in=criteria).values(
+                'id', 'name', 'last_notified_at', 'updated_at')
+        }
+        # As before, a search counts the matches changed since it last notified,
+        # or every match if it never has. Searches saved after the checkpoint
+        # (edited or reactivated) also need the profiles it had already passed;
+        # the rest only the ones changed since.
+        work = []
+        backfill = []
+        for search_id, search in searches.items():
+            since = search['last_notified_at']
+            if checkpoint.position and (since is None or search['updated_at'] > checkpoint.position):
+                backfill.append(since)
+            elif checkpoint.position:
+                since = max(since, checkpoint.position)
+            work.append((search_id, criteria[search_id], since))
+        if backfill:
+            unchanged = Profile.objects.filter(profile_visible=True, updated_at__lte=checkpoint.position)
+            if None not in backfill:
+                unchanged = unchanged.filter(updated_at__gt=min(backfill))
+            profiles += self.profile_rows(unchanged)
+        timings['load'] = time.monotonic() - started
+        
+        started = time.monotonic()
+        found = dict(self.evaluate(work, profiles, options))
+        timings['evaluate'] = time.monotonic() - started
         
-        total_notifications = 0
+        started = time.monotonic()
+        pairs = []
+        for search_id, profile_ids in found.items():
+            if not profile_ids:
+                continue
+            pairs.extend((search_id, profile_id) for profile_id in profile_ids)
+            self.stdout.write(
+                self.style.SUCCESS(f'Found {len(profile_ids)} new matches for "{searches[search_id]["name"]}"')
+            )
         
-        for search in active_searches:
-            # Get new matches since last notification
-            if search.last_notified_at:
-                new_matches = search.get_new_matches_since(search.last_notified_at)
-            else:
-                # First time - get all matches
-                new_matches = search.get_matching_candidates()
-            
-            if new_matches.exists():
-                # Create notification
-                match_count = new_matches.count()
-                message = f"{match_count} new candidate{'s' if match_count > 1 else ''} match your '{search.name}' search"
-                
-                SearchNotification.objects.create(
-                    saved_search=search,
-                    message=message
-                )
-                
-                # Update last notified timestamp
-                search.last_notified_at = timezone.now()
-                search.save()
-                
-                total_notifications += 1
-                
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created notification for "{search.name}": {match_count} new matches')
-                )
+        created = 0
+        if not options['dry_run']:
+            with transaction.atomic():
+                # Flushed right away along with any matches the signal buffered,
+                # as one digest per search
+                digests.add_pending(pairs)
+                created = digests.flush()
+                checkpoint.position = high_water
+                checkpoint.save()
+        timings['write'] = time.monotonic() - started
         
-        if total_notifications == 0:
+        if options['dry_run']:
+            self.stdout.write(
+                f'Dry run: {len(profiles)} profiles x {len(work)} searches; '
+                + ', '.join(f'{phase} {seconds:.3f}s' for phase, seconds in timings.items())
+            )
+        if not pairs:
             self.stdout.write(self.style.WARNING('No new matches found for any saved searches'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Would buffer {len(pairs)} matches'))
         else:
             self.stdout.write(
-                self.style.SUCCESS(f'Successfully created {total_notifications} notifications')
+                self.style.SUCCESS(f'Successfully created {created} notifications')
             )
 
+    def profile_rows(self, queryset):
+        """(id, skill mask, texts, updated_at) for each profile, see matching.profile_texts"""
+        return [
+            (row['id'], skill_bits.unpack(row['skill_bits']), matching.profile_texts(row), row['updated_at'])
+            for row in queryset.values('id', 'skill_bits', 'updated_at', *matching.PROFILE_FIELDS)
+        ]
+
+    def evaluate(self, work, profiles, options):
+        """Each search's new matches, in chunks of searches across a process pool"""
+        chunk_size = max(1, options['chunk_size'])
+        chunks = [work[i:i + chunk_size] for i in range(0, len(work), chunk_size)]
+        if options['workers'] <= 1 or len(chunks) <= 1:
+            return [pair for chunk in chunks for pair in matching.new_matches(chunk, profiles)]
+        
+        # Workers never touch the database; don't hand them open connections
+        connections.close_all()
+        with multiprocessing.Pool(options['workers'], initializer=matching.init_worker,
+                                  initargs=(profiles,)) as pool:
+            return [pair for found in pool.imap_unordered(matching.new_matches, chunks)
+                    for pair in found]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from accounts import digests
+
+
+class Command(BaseCommand):
+    help = 'Send buffered saved-search matches as one notification per search'
+
+    def handle(self, *args, **options):
+        """Flush the pending digest buffer now, e.g. from cron when no worker runs"""
+        created = digests.flush()
+        if created:
+            self.stdout.write(self.style.SUCCESS(f'Successfully created {created} notifications'))
+        else:
+            self.stdout.write(self.style.WARNING('No pending matches to notify'))
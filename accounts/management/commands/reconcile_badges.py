@@ -0,0 +1,27 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from accounts import badges
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached unread-badge counts of every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users recounted per batch of queries')
+
+    def handle(self, *args, **options):
+        """Run periodically (e.g. from cron) to correct counts that drifted"""
+        if isinstance(caches['default'], LocMemCache):
+            # This process's memory isn't where the web workers keep their counts
+            raise CommandError('Reconciling badges needs a shared cache; set JOBFINDER_CACHE_DIR')
+        chunk_size = max(1, options['chunk_size'])
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        corrected = 0
+        for start in range(0, len(user_ids), chunk_size):
+            corrected += badges.reconcile(user_ids[start:start + chunk_size])
+
+        message = f'Recounted badges of {len(user_ids)} users, {corrected} cached counts were wrong'
+        self.stdout.write(self.style.SUCCESS(message) if not corrected else self.style.WARNING(message))
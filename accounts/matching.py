@@ -0,0 +1,57 @@
+"""
+In-memory saved-search matching, shared by the percolator and the
+check_new_matches workers. Nothing here touches the database (or Django),
+so it can run in pool workers.
+"""
+from home import keywords
+
+# Profile fields a search's location is matched against, as lowercased text
+TEXT_FIELDS = ("location",)
+
+# Every Profile value profile_texts needs
+PROFILE_FIELDS = TEXT_FIELDS + tuple(keywords.PROFILE_FIELDS) + tuple(keywords.PROFILE_FIELDS.values())
+
+# Set in each pool worker by init_worker
+_profiles = None
+
+
+def profile_texts(values):
+    """
+    What searches are matched against, from a mapping of PROFILE_FIELDS:
+    lowercased text, and the words of each keyword field the profile shows
+    (hidden fields have none, as in the profile keyword index)
+    """
+    texts = {field: (values[field] or "").lower() for field in TEXT_FIELDS}
+    for field, flag in keywords.PROFILE_FIELDS.items():
+        texts[field] = keywords.tokens(values[field]) if values[flag] else ()
+    return texts
+
+
+def matches(criteria, profile_mask, texts):
+    """In-memory twin of SavedSearch.get_matching_candidates for one profile"""
+    if criteria["skills"] & ~profile_mask:
+        return False
+    if not all(term in texts[field] for field, terms in criteria["criteria"] for term in terms):
+        return False
+    return all(keywords.matches(alternatives, texts[field]) for field, alternatives in criteria["keywords"])
+
+
+def init_worker(profiles):
+    global _profiles
+    _profiles = profiles
+
+
+def new_matches(searches, profiles=None):
+    """
+    (search id, matching profile ids) for each (search id, criteria, since)
+    in searches, among the (id, mask, texts, updated_at) profiles changed
+    after since (every profile when since is None)
+    """
+    profiles = profiles if profiles is not None else _profiles
+    found = []
+    for search_id, criteria, since in searches:
+        found.append((search_id, [
+            profile_id for profile_id, mask, texts, updated_at in profiles
+            if (since is None or updated_at > since) and matches(criteria, mask, texts)
+        ]))
+    return found
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0012_task'),
+        ('accounts', '0006_matchcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='home.profile')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_matches', to='accounts.savedsearch')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pendingmatch',
+            constraint=models.UniqueConstraint(fields=('saved_search', 'profile'), name='accounts_pendingmatch_uniq'),
+        ),
+    ]
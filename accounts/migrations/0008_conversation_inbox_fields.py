@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:35
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Left
+
+
+def populate_inbox_fields(apps, schema_editor):
+    """Same values as accounts.inbox.refresh, for every conversation"""
+    Conversation = apps.get_model("accounts", "Conversation")
+    Message = apps.get_model("accounts", "Message")
+
+    def unread_for(role):
+        unread = (
+            Message.objects.filter(conversation=OuterRef("pk"), read_at__isnull=True)
+            .exclude(sender=OuterRef(f"{role}_id"))
+            .order_by()
+            .values("conversation")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return Coalesce(Subquery(unread), 0)
+
+    latest = Message.objects.filter(conversation=OuterRef("pk")).order_by("-created_at", "-id")
+    Conversation.objects.update(
+        last_message_at=Subquery(latest.values("created_at")[:1]),
+        last_message_preview=Coalesce(Left(Subquery(latest.values("content")[:1]), 100), Value("")),
+        recruiter_unread=unread_for("recruiter"),
+        candidate_unread=unread_for("candidate"),
+    )
+    # The inbox is ordered by updated_at, which a new message now bumps
+    Conversation.objects.filter(last_message_at__gt=F("updated_at")).update(updated_at=F("last_message_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_pendingmatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='candidate_unread',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='recruiter_unread',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['recruiter', '-updated_at', '-id'], name='accounts_conv_recruiter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['candidate', '-updated_at', '-id'], name='accounts_conv_candidate_idx'),
+        ),
+        migrations.RunPython(populate_inbox_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_conversation_inbox_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-created_at', '-id'], name='accounts_msg_conv_created_idx'),
+        ),
+    ]
@@ -54,9 +54,20 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Denormalized from the messages, maintained by accounts.inbox
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_message_preview = models.CharField(max_length=100, blank=True, editable=False)
+    recruiter_unread = models.PositiveIntegerField(default=0, editable=False)
+    candidate_unread = models.PositiveIntegerField(default=0, editable=False)
+    
     class Meta:
         unique_together = ['recruiter', 'candidate']
         ordering = ['-updated_at']
+        indexes = [
+            # Inbox pages, most recently active first (see conversation_list)
+            models.Index(fields=['recruiter', '-updated_at', '-id'], name='accounts_conv_recruiter_idx'),
+            models.Index(fields=['candidate', '-updated_at', '-id'], name='accounts_conv_candidate_idx'),
+        ]
     
     def __str__(self):
         return f"Conversation: {self.recruiter.username} <-> {self.candidate.username}"
@@ -67,6 +78,10 @@ class Conversation(models.Model):
     
     def get_unread_count_for_user(self, user):
         """Get the number of unread messages for a specific user"""
+        if user.id == self.recruiter_id:
+            return self.recruiter_unread
+        if user.id == self.candidate_id:
+            return self.candidate_unread
         return self.messages.exclude(
             sender=user
         ).filter(
@@ -84,15 +99,23 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # History windows, newest first (see conversation_detail)
+            models.Index(fields=['conversation', '-created_at', '-id'], name='accounts_msg_conv_created_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} in {self.conversation}"
     
     def mark_as_read(self):
         """Mark this message as read"""
+        from . import inbox
+        
         if not self.read_at:
             self.read_at = timezone.now()
-            self.save()
+            # Only the request that actually flips it updates the counters
+            if Message.objects.filter(id=self.id, read_at__isnull=True).update(read_at=self.read_at):
+                inbox.message_read(self)
     
     @property
     def is_read(self):
@@ -137,37 +160,30 @@ class SavedSearch(models.Model):
     
     def get_matching_candidates(self):
         """Get candidates that match this search criteria"""
+        from home import profile_search
         from home.models import Profile
+        from home.skills import with_all_skills
         
         # Start with all visible profiles
         candidates = Profile.objects.filter(profile_visible=True)
         
-        # Filter by skills
-        if self.skills.exists():
-            for skill in self.skills.all():
-                candidates = candidates.filter(skills=skill)
+        # Filter by skills (candidates must have all of them)
+        skill_ids = list(self.skills.values_list('id', flat=True))
+        if skill_ids:
+            candidates = with_all_skills(candidates, skill_ids)
         
         # Filter by location
         if self.location:
             candidates = candidates.filter(location__icontains=self.location)
         
-        # Filter by headline keywords
-        if self.headline_keywords:
-            keywords = self.headline_keywords.split(',')
-            for keyword in keywords:
-                candidates = candidates.filter(headline__icontains=keyword.strip())
-        
-        # Filter by education keywords
-        if self.education_keywords:
-            keywords = self.education_keywords.split(',')
-            for keyword in keywords:
-                candidates = candidates.filter(education__icontains=keyword.strip())
-        
-        # Filter by experience keywords
-        if self.experience_keywords:
-            keywords = self.experience_keywords.split(',')
-            for keyword in keywords:
-                candidates = candidates.filter(work_experience__icontains=keyword.strip())
+        # Keywords are looked up in the profile keyword index, which only
+        # holds the fields candidates show (see home.profile_search)
+        candidates = profile_search.filter_profiles(
+            candidates,
+            headline=self.headline_keywords,
+            education=self.education_keywords,
+            work_experience=self.experience_keywords,
+        )
         
         return candidates.distinct()
     
@@ -189,3 +205,32 @@ class SearchNotification(models.Model):
     
     def __str__(self):
         return f"Notification for {self.saved_search.name}"
+
+
+class PendingMatch(models.Model):
+    """
+    A profile matched by a saved search, buffered until the next digest
+    flush turns each search's matches into one notification (see
+    accounts.digests). A profile is only buffered once per search.
+    """
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="pending_matches")
+    profile = models.ForeignKey('home.Profile', on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["saved_search", "profile"], name="accounts_pendingmatch_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Profile {self.profile_id} for {self.saved_search_id}"
+
+
+class MatchCheckpoint(models.Model):
+    """High-water mark of an incremental job, e.g. check_new_matches"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.DateTimeField(null=True, blank=True, help_text="Newest change already processed")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
@@ -0,0 +1,122 @@
+"""
+Saved-search percolator: instead of running every saved search against a
+changed profile, index the searches by one of their criteria and only
+verify the few that could match.
+
+Each notifying search is filed under a single anchor it can't match
+without: one of its required skills, or else a trigram of its location (a
+substring match implies every trigram is shared) or the first three
+letters of a word all its keyword alternatives require. Searches with
+nothing to anchor on match every profile and are always checked.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from home import keywords, skill_bits
+
+from .matching import PROFILE_FIELDS, matches, profile_texts
+from .models import SavedSearch
+
+# SavedSearch keyword field -> Profile field it is matched against
+KEYWORD_FIELDS = {
+    "headline_keywords": "headline",
+    "education_keywords": "education",
+    "experience_keywords": "work_experience",
+}
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _anchor(skill_ids, criteria, keyword_criteria):
+    if skill_ids:
+        return ("skill", min(skill_ids))
+    words = [(field, term) for field, terms in criteria for term in terms]
+    for field, alternatives in keyword_criteria:
+        if len(alternatives) == 1:
+            # Every match has a word equal to (or, for one-word phrases,
+            # starting with) each phrase's first word
+            words.extend((field, phrase[0]) for phrase in alternatives[0])
+    field, word = max(words, key=lambda item: len(item[1]), default=(None, ""))
+    if len(word) < 3:
+        return None
+    return (field, word[:3])
+
+
+def build_index():
+    """
+    (anchor -> search ids, search id -> criteria) for active notifying
+    searches, read in two queries
+    """
+    skills = {}
+    for search_id, skill_id in SavedSearch.skills.through.objects.filter(
+        savedsearch__is_active=True, savedsearch__notify_on_new_matches=True,
+    ).values_list("savedsearch_id", "skill_id"):
+        skills.setdefault(search_id, set()).add(skill_id)
+
+    anchors = {}
+    searches = {}
+    rows = SavedSearch.objects.filter(is_active=True, notify_on_new_matches=True).values(
+        "id", "location", *KEYWORD_FIELDS)
+    for row in rows:
+        criteria = []
+        if row["location"]:
+            criteria.append(("location", [row["location"].lower()]))
+        keyword_criteria = []
+        for search_field, profile_field in KEYWORD_FIELDS.items():
+            alternatives = keywords.parse(row[search_field])
+            if alternatives:
+                keyword_criteria.append((profile_field, alternatives))
+        skill_ids = skills.get(row["id"], set())
+        searches[row["id"]] = {
+            "skills": skill_bits.to_mask(skill_ids),
+            "criteria": criteria,
+            "keywords": keyword_criteria,
+        }
+        anchors.setdefault(_anchor(skill_ids, criteria, keyword_criteria), []).append(row["id"])
+    return anchors, searches
+
+
+def _fingerprint():
+    """
+    Changes whenever a saved search or its skills are created, saved or
+    deleted. Read from the database, so the worker process sees edits made
+    by the web processes whatever their caches.
+    """
+    searches = SavedSearch.objects.aggregate(count=Count("id"), last_id=Max("id"), updated=Max("updated_at"))
+    skills = SavedSearch.skills.through.objects.aggregate(count=Count("id"), last_id=Max("id"))
+    updated = searches["updated"].timestamp() if searches["updated"] else 0
+    return f"{searches['count']}.{searches['last_id']}.{updated}.{skills['count']}.{skills['last_id']}"
+
+
+def saved_search_index():
+    """build_index(), cached until the saved searches change (or SAVED_SEARCH_INDEX_TTL passes)"""
+    key = f"accounts:percolator:{_fingerprint()}"
+    index = cache.get(key)
+    if index is None:
+        index = build_index()
+        cache.set(key, index, getattr(settings, "SAVED_SEARCH_INDEX_TTL", 300))
+    return index
+
+
+def matching_search_ids(profile):
+    """Ids of the active notifying saved searches that the profile matches"""
+    if not profile.profile_visible:
+        return []
+    anchors, searches = saved_search_index()
+    profile_mask = profile.skill_mask
+    texts = profile_texts({field: getattr(profile, field) for field in PROFILE_FIELDS})
+
+    candidates = list(anchors.get(None, []))
+    for skill_id in skill_bits.skill_ids(profile_mask):
+        candidates.extend(anchors.get(("skill", skill_id), []))
+    for gram in _trigrams(texts["location"]):
+        candidates.extend(anchors.get(("location", gram), []))
+    for field in keywords.PROFILE_FIELDS:
+        for word in set(texts[field]):
+            candidates.extend(anchors.get((field, word[:3]), []))
+
+    return sorted(search_id for search_id in set(candidates)
+                  if matches(searches[search_id], profile_mask, texts))
@@ -0,0 +1,101 @@
+"""
+Real-time delivery of new messages to open conversations.
+
+Saving a Message publishes its conversation's channel on the message hub
+once the transaction commits. The conversation_events stream waits on that
+channel and then reads the new messages from the database, so the hub only
+carries wake-ups, never message content.
+
+The hub class is set with MESSAGE_HUB_BACKEND. LocalHub only wakes
+listeners in the publishing process; running several server processes
+needs a backend on a shared broker with the same subscribe/publish methods.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def conversation_channel(conversation_id):
+    return f"conversation:{conversation_id}"
+
+
+class Subscription:
+    """A listener's wake-ups on one channel, used as a context manager"""
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def notify(self):
+        """Wake the listener; safe to call from any thread"""
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # Its event loop has already closed
+
+    async def wait(self, timeout):
+        """Whether the channel was published since the last wait, waiting up to timeout seconds"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.hub.unsubscribe(self)
+
+
+class LocalHub:
+    """In-memory hub for the listeners of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, channel):
+        """Call from the listener's event loop"""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            listeners = self._subscriptions.get(subscription.channel, set())
+            listeners.discard(subscription)
+            if not listeners:
+                self._subscriptions.pop(subscription.channel, None)
+
+    def publish(self, channel):
+        with self._lock:
+            listeners = list(self._subscriptions.get(channel, ()))
+        for subscription in listeners:
+            subscription.notify()
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """The process-wide hub of the configured MESSAGE_HUB_BACKEND class"""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = import_string(getattr(settings, "MESSAGE_HUB_BACKEND", "accounts.realtime.LocalHub"))()
+    return _hub
+
+
+def publish_message(message):
+    """Wake the conversation's listeners once the message is committed"""
+    channel = conversation_channel(message.conversation_id)
+    transaction.on_commit(lambda: get_hub().publish(channel))
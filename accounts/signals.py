@@ -1,46 +1,54 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from django.utils import timezone
+from home import task_queue
 from home.models import Profile
-from .models import SavedSearch, SearchNotification
+from . import badges, inbox, realtime
+from .models import Message, SavedSearch, SearchNotification
 
 
 @receiver(post_save, sender=Profile)
 def check_saved_searches_for_new_matches(sender, instance, created, **kwargs):
     """
-    Automatically check if updated profile matches any saved searches
-    and create notifications for recruiters
+    Queue a check of the updated profile against the saved searches; the
+    worker creates the recruiters' notifications (see accounts.tasks)
     """
     if not instance.profile_visible:
         return  # Don't notify for invisible profiles
     
-    # Get all active saved searches
-    active_searches = SavedSearch.objects.filter(
-        is_active=True,
-        notify_on_new_matches=True
+    # One pending check per profile is enough, however often it is saved
+    task_queue.enqueue(
+        "accounts.notify_saved_search_matches",
+        {"profile_id": instance.id},
+        key=f"notify_saved_search_matches:{instance.id}",
     )
-    
-    for search in active_searches:
-        # Check if this profile matches the search criteria
-        matches = search.get_matching_candidates().filter(id=instance.id)
-        
-        if matches.exists():
-            # Check if we should notify (avoid duplicate notifications)
-            recent_notification = SearchNotification.objects.filter(
-                saved_search=search,
-                created_at__gte=timezone.now() - timezone.timedelta(hours=1)
-            ).exists()
-            
-            if not recent_notification:
-                # Create notification
-                message = f"New candidate {instance.user.username} matches your '{search.name}' search"
-                
-                SearchNotification.objects.create(
-                    saved_search=search,
-                    message=message
-                )
-                
-                # Update last notified timestamp
-                search.last_notified_at = timezone.now()
-                search.save()
 
+
+@receiver(post_save, sender=Message)
+def update_conversation_on_message_save(sender, instance, created, **kwargs):
+    if created:
+        inbox.message_sent(instance)
+        realtime.publish_message(instance)
+    else:
+        # Edited (e.g. in the admin): recount rather than guess what changed
+        inbox.refresh([instance.conversation_id])
+
+
+@receiver(post_delete, sender=Message)
+def update_conversation_on_message_delete(sender, instance, **kwargs):
+    inbox.refresh([instance.conversation_id])
+
+
+@receiver(post_save, sender=SearchNotification)
+def count_notification(sender, instance, created, **kwargs):
+    """Digests bulk-create theirs and adjust the badges themselves (see accounts.digests)"""
+    recruiter_id = instance.saved_search.recruiter_id
+    if not created:
+        badges.invalidate([recruiter_id], kinds=["notifications"])
+    elif not instance.is_read:
+        badges.adjust("notifications", [recruiter_id], 1)
+
+
+@receiver(pre_delete, sender=SavedSearch)
+def uncount_notifications_of_deleted_search(sender, instance, **kwargs):
+    # Its notifications go with it
+    badges.invalidate([instance.recruiter_id], kinds=["notifications"])
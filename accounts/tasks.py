@@ -0,0 +1,28 @@
+from home.models import Profile
+from home.task_queue import task
+from . import digests, percolator
+
+
+@task("accounts.notify_saved_search_matches")
+def notify_saved_search_matches(profile_id):
+    """
+    Check if a saved profile matches any saved searches and buffer the
+    matches for the recruiters' next notification digest
+    """
+    profile = Profile.objects.filter(id=profile_id).first()
+    if profile is None or not profile.profile_visible:
+        return  # Don't notify for deleted or invisible profiles
+    
+    # Only the searches the percolator index says could match are checked, in memory
+    matched_ids = percolator.matching_search_ids(profile)
+    if not matched_ids:
+        return
+    
+    # Buffered for the next digest rather than notified one by one
+    digests.buffer_matches((search_id, profile.id) for search_id in matched_ids)
+
+
+@task(digests.FLUSH_TASK)
+def flush_digests():
+    """Send the buffered saved-search matches as one notification per search"""
+    digests.flush()
@@ -2,7 +2,7 @@ from django.urls import path
 from .views import (
     register, RoleLoginView, RoleLogoutView,
     recruiter_welcome, recruiter_dashboard, job_create, job_edit, candidate_search,
-    conversation_list, conversation_detail, start_conversation,
+    conversation_list, conversation_detail, conversation_events, start_conversation,
     saved_searches, create_saved_search, edit_saved_search, delete_saved_search,
     saved_search_results, notifications, job_candidate_recommendations
 )
@@ -22,6 +22,7 @@ urlpatterns = [
     # Messaging URLs
     path("messages/", conversation_list, name="conversation_list"),
     path("messages/<int:conversation_id>/", conversation_detail, name="conversation_detail"),
+    path("messages/<int:conversation_id>/events/", conversation_events, name="conversation_events"),
     path("messages/start/<int:candidate_id>/", start_conversation, name="start_conversation"),
     
     # Saved Search URLs
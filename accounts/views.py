@@ -1,14 +1,24 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import login
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Q
+from django.http import Http404, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import dateformat, timezone
 
 from .forms import RegisterForm, JobPostForm, CandidateSearchForm, MessageForm, ConversationForm, SavedSearchForm
+from . import badges, inbox, realtime
 from .models import User, Conversation, Message, SavedSearch, SearchNotification
 from home.models import JobPost, Profile   # ✅ import Profile from home.models
+from home import candidate_index, pagination, profile_search, skill_bits
 
 
 def register(request):
@@ -65,15 +75,9 @@ def recruiter_welcome(request):
 def recruiter_dashboard(request):
     my_jobs = JobPost.objects.filter(created_by=request.user).order_by("-created_at")
     
-    # Get notification count for the recruiter
-    notification_count = SearchNotification.objects.filter(
-        saved_search__recruiter=request.user,
-        is_read=False
-    ).count()
-    
+    # Unread counts come from the unread_badges context processor
     return render(request, "accounts/recruiter_dashboard.html", {
         "my_jobs": my_jobs,
-        "notification_count": notification_count
     })
 
 
@@ -132,13 +136,11 @@ def candidate_search(request):
             qs = qs.filter(location__icontains=location_contains)
 
         if projects_contains:
-            qs = qs.filter(
-                Q(work_experience__icontains=projects_contains) |  # ✅ changed from projects to work_experience
-                Q(education__icontains=projects_contains) |
-                Q(headline__icontains=projects_contains)
-            )
+            # Headline, education or work experience, through the keyword index
+            qs = profile_search.filter_profiles(qs, projects_contains)
 
-        results = qs.order_by("user__username")
+        # Best keyword matches first, then by name
+        results = profile_search.ranked(qs.order_by("user__username"), projects_contains)
 
     return render(request, "accounts/candidate_search.html", {
         "form": form,
@@ -152,39 +154,43 @@ def candidate_search(request):
 
 @login_required
 def conversation_list(request):
-    """List all conversations for the current user"""
+    """List the current user's conversations, most recently active first, one page at a time"""
+    # Latest message and unread counts are denormalized on Conversation (see accounts.inbox)
     if request.user.role == User.RECRUITER:
-        conversations = Conversation.objects.filter(recruiter=request.user).select_related('candidate')
+        conversations = Conversation.objects.filter(recruiter=request.user).select_related('candidate').annotate(
+            unread_count=F('recruiter_unread'))
     else:
-        conversations = Conversation.objects.filter(candidate=request.user).select_related('recruiter')
+        conversations = Conversation.objects.filter(candidate=request.user).select_related('recruiter').annotate(
+            unread_count=F('candidate_unread'))
+    cursor = pagination.decode_cursor(request.GET.get('cursor'), 'newest')
+    page, next_cursor = pagination.newest_first_page(
+        conversations, cursor, pagination.page_size_from(request), field='updated_at')
     
-    # Add unread counts and latest message info
-    for conversation in conversations:
-        conversation.unread_count = conversation.get_unread_count_for_user(request.user)
-        conversation.latest_message = conversation.get_latest_message()
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_query = query.urlencode()
     
     return render(request, "accounts/conversation_list.html", {
-        "conversations": conversations
+        "conversations": page,
+        "next_query": next_query,
+        "is_first_page": 'cursor' not in request.GET,
     })
 
 
 @login_required
 def conversation_detail(request, conversation_id):
     """View a specific conversation and its messages"""
-    conversation = get_object_or_404(Conversation, id=conversation_id)
+    conversation = get_object_or_404(Conversation.objects.select_related('recruiter', 'candidate'), id=conversation_id)
     
     # Check if user is part of this conversation
     if request.user not in [conversation.recruiter, conversation.candidate]:
         messages.error(request, "You don't have permission to view this conversation.")
         return redirect("accounts:conversation_list")
     
-    # Get all messages in this conversation
-    message_list = conversation.messages.all()
-    
-    # Mark messages as read when viewing
-    for message in message_list:
-        if message.sender != request.user and not message.is_read:
-            message.mark_as_read()
+    # Mark what the other participant sent as read, in bulk
+    inbox.mark_read(conversation, request.user)
     
     # Handle new message form
     if request.method == "POST":
@@ -202,14 +208,117 @@ def conversation_detail(request, conversation_id):
     # Determine the other participant
     other_user = conversation.candidate if request.user == conversation.recruiter else conversation.recruiter
     
+    # The newest messages, then older windows through the cursor; shown oldest first
+    cursor = pagination.decode_cursor(request.GET.get('cursor'), 'newest')
+    page, older_cursor = pagination.newest_first_page(
+        conversation.messages.select_related('sender'), cursor, pagination.page_size_from(request))
+    
+    older_query = None
+    if older_cursor:
+        query = request.GET.copy()
+        query['cursor'] = older_cursor
+        older_query = query.urlencode()
+    
     return render(request, "accounts/conversation_detail.html", {
         "conversation": conversation,
-        "message_list": message_list,
+        "message_list": page[::-1],
         "form": form,
-        "other_user": other_user
+        "other_user": other_user,
+        "older_query": older_query,
+        "is_first_page": 'cursor' not in request.GET,
+        # New messages are streamed in after this one (see conversation_events)
+        "last_message_id": page[0].id if page else 0,
     })
 
 
+def _events_conversation(request, conversation_id):
+    """(user, conversation) when the user takes part in it, else (user, None)"""
+    user = request.user
+    if not user.is_authenticated:
+        return None, None
+    conversation = Conversation.objects.filter(
+        Q(recruiter=user) | Q(candidate=user), id=conversation_id).first()
+    return user, conversation
+
+
+def _messages_after(conversation, user, after):
+    """The conversation's messages after id after, as event data; delivered ones count as read"""
+    new = list(conversation.messages.filter(id__gt=after).select_related('sender').order_by('id'))
+    if any(message.sender_id != user.id for message in new):
+        inbox.mark_read(conversation, user)
+    return [
+        {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "sender": message.sender.username,
+            "content": message.content,
+            "created_at": dateformat.format(timezone.localtime(message.created_at), "M d, Y H:i"),
+        }
+        for message in new
+    ]
+
+
+async def conversation_events(request, conversation_id):
+    """
+    Server-Sent Events stream of a conversation's new messages, after the
+    message id in ?after= or the Last-Event-ID header of a reconnect.
+    Served over ASGI the stream stays open; under WSGI each response
+    carries whatever is new right away and the browser reconnects after
+    MESSAGE_EVENTS_KEEPALIVE seconds.
+    """
+    user, conversation = await sync_to_async(_events_conversation)(request, conversation_id)
+    if user is None:
+        return HttpResponseForbidden()
+    if conversation is None:
+        raise Http404("No such conversation")
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        after = 0
+    
+    def events(batch):
+        for message in batch:
+            yield f"id: {message['id']}\nevent: message\ndata: {json.dumps(message)}\n\n"
+    
+    keepalive = getattr(settings, 'MESSAGE_EVENTS_KEEPALIVE', 15)
+    if not isinstance(request, ASGIRequest):
+        # A sync worker must not block waiting: the hub only wakes listeners
+        # in its own process, and the message is posted to another worker.
+        # The browser polls again after a keepalive interval instead.
+        batch = await sync_to_async(_messages_after)(conversation, user, after)
+        content = [f"retry: {int(keepalive * 1000)}\n\n", *events(batch)]
+        response = StreamingHttpResponse(iter(content), content_type="text/event-stream")
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    max_seconds = getattr(settings, 'MESSAGE_EVENTS_MAX_SECONDS', 300)
+    channel = realtime.conversation_channel(conversation.id)
+    
+    async def stream():
+        last_id = after
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_seconds
+        # Subscribed before the first read, so no message falls in between
+        with realtime.get_hub().subscribe(channel) as subscription:
+            yield "retry: 1000\n\n"
+            while True:
+                batch = await sync_to_async(_messages_after)(conversation, user, last_id)
+                for event in events(batch):
+                    yield event
+                if batch:
+                    last_id = batch[-1]["id"]
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                if not await subscription.wait(min(keepalive, remaining)):
+                    yield ": keepalive\n\n"
+    
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 @user_passes_test(is_recruiter)
 def start_conversation(request, candidate_id):
@@ -329,7 +438,12 @@ def delete_saved_search(request, search_id):
 def saved_search_results(request, search_id):
     """View results for a specific saved search"""
     search = get_object_or_404(SavedSearch, id=search_id, recruiter=request.user)
-    candidates = search.get_matching_candidates()
+    candidates = profile_search.ranked(
+        search.get_matching_candidates().select_related("user").prefetch_related("skills"),
+        headline=search.headline_keywords,
+        education=search.education_keywords,
+        work_experience=search.experience_keywords,
+    )
     
     return render(request, "accounts/saved_search_results.html", {
         "search": search,
@@ -340,16 +454,30 @@ def saved_search_results(request, search_id):
 @login_required
 @user_passes_test(is_recruiter)
 def notifications(request):
-    """Display notifications for the recruiter"""
+    """Display notifications for the recruiter, one page at a time"""
     notifications_list = SearchNotification.objects.filter(
         saved_search__recruiter=request.user
-    ).order_by('-created_at')
+    ).select_related('saved_search')
+    cursor = pagination.decode_cursor(request.GET.get('cursor'), 'newest')
+    page, next_cursor = pagination.newest_first_page(
+        notifications_list, cursor, pagination.page_size_from(request))
     
-    # Mark all notifications as read
-    notifications_list.update(is_read=True)
+    # Mark the notifications shown on this page as read
+    unread_ids = [notification.id for notification in page if not notification.is_read]
+    if unread_ids:
+        marked = SearchNotification.objects.filter(id__in=unread_ids, is_read=False).update(is_read=True)
+        badges.adjust("notifications", [request.user.id], -marked)
+    
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_query = query.urlencode()
     
     return render(request, "accounts/notifications.html", {
-        "notifications": notifications_list
+        "notifications": page,
+        "next_query": next_query,
+        "is_first_page": 'cursor' not in request.GET,
     })
 
 
@@ -361,24 +489,37 @@ def job_candidate_recommendations(request, job_id):
     
     # Get job skills
     job_skills = set(job.skills.all())
+    skills_by_id = {skill.id: skill for skill in job_skills}
+    job_mask = job.skill_mask
     
-    # Find candidates with matching skills
-    candidates = Profile.objects.filter(profile_visible=True)
-    
+    # Rank candidates sharing any of the job's skills through the skill -> profile index
     if job_skills:
-        # Filter candidates who have at least one matching skill
-        for skill in job_skills:
-            candidates = candidates.filter(skills=skill)
+        ranked = candidate_index.ranked_candidates(skills_by_id)
+    else:
+        limit = getattr(settings, 'CANDIDATE_RECOMMENDATION_LIMIT', 500)
+        ranked = [(profile_id, 0) for profile_id in Profile.objects.filter(profile_visible=True)
+                  .order_by('id').values_list('id', flat=True)[:limit]]
+    
+    # Only the page's profiles are loaded
+    cursor = pagination.decode_cursor(request.GET.get('cursor'), 'candidates')
+    page_keys, next_cursor = pagination.seek(
+        [(-common_count, profile_id) for profile_id, common_count in ranked],
+        cursor, pagination.page_size_from(request), 'candidates')
+    profiles = Profile.objects.select_related('user').in_bulk([key[-1] for key in page_keys])
     
-    # Calculate match scores for each candidate
+    # Calculate match scores for each candidate from the skill bitmasks
     candidate_scores = []
-    for candidate in candidates:
-        candidate_skills = set(candidate.skills.all())
-        common_skills = job_skills.intersection(candidate_skills)
+    for key in page_keys:
+        candidate = profiles.get(key[-1])
+        if candidate is None:
+            continue
+        candidate_mask = candidate.skill_mask
+        common_mask = job_mask & candidate_mask
+        common_count = skill_bits.popcount(common_mask)
         
         if job_skills:
-            match_percentage = len(common_skills) / len(job_skills)
-            skill_bonus = len(common_skills) * 0.1
+            match_percentage = common_count / len(job_skills)
+            skill_bonus = common_count * 0.1
             match_score = match_percentage + skill_bonus
         else:
             match_score = 0.5  # Default score if job has no skills
@@ -386,15 +527,23 @@ def job_candidate_recommendations(request, job_id):
         candidate_scores.append({
             'candidate': candidate,
             'score': match_score,
-            'common_skills': list(common_skills),
-            'missing_skills': list(job_skills - candidate_skills)
+            # Bits without a matching job skill (a stale mask) are skipped, as in recommendations.explain
+            'common_skills': [skills_by_id[i] for i in skill_bits.skill_ids(common_mask) if i in skills_by_id],
+            'missing_skills': [skills_by_id[i] for i in skill_bits.skill_ids(job_mask & ~candidate_mask)
+                               if i in skills_by_id]
         })
     
-    # Sort by match score
-    candidate_scores.sort(key=lambda x: x['score'], reverse=True)
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_query = query.urlencode()
     
     return render(request, "accounts/job_candidate_recommendations.html", {
         "job": job,
         "candidate_scores": candidate_scores,
-        "job_skills": job_skills
+        "job_skills": job_skills,
+        "total_candidates": len(ranked),
+        "next_query": next_query,
+        "is_first_page": 'cursor' not in request.GET,
     })
@@ -1,109 +1,109 @@
 from django.contrib import admin
-from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Count
-import csv
-import datetime
+from django.db.models import Count, Q, Sum
 
-from .models import JobPost, Skill
+from . import exports
+from .models import Application, JobPost, Profile, Skill, Task
 
 def export_jobs_with_applications(modeladmin, request, queryset):
     """Export jobs with detailed application metrics"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="jobs_with_applications_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    statuses = ['applied', 'review', 'interview', 'offer', 'closed']
     
-    writer = csv.writer(response)
-    writer.writerow([
+    def rows():
+        jobs = queryset.select_related('created_by').prefetch_related(None).prefetch_related('skills')
+        for chunk in exports.chunks(jobs):
+            # Application counts by status for the whole chunk in one query
+            counts = {}
+            for job_id, status, total in (
+                Application.objects.filter(job_id__in=[job.id for job in chunk])
+                .order_by().values_list('job_id', 'status').annotate(total=Count('id'))
+            ):
+                counts.setdefault(job_id, {})[status] = total
+            
+            for job in chunk:
+                status_counts = counts.get(job.id, {})
+                skills = ', '.join([skill.name for skill in job.skills.all()])
+                salary_range = 'N/A'
+                if job.min_salary or job.max_salary:
+                    min_sal = f"${job.min_salary:,.0f}" if job.min_salary else "N/A"
+                    max_sal = f"${job.max_salary:,.0f}" if job.max_salary else "N/A"
+                    salary_range = f"{min_sal} - {max_sal}"
+                
+                days_active = (timezone.now().date() - job.created_at.date()).days
+                
+                yield [
+                    job.id,
+                    job.title,
+                    job.created_by.username,
+                    job.location or 'Not specified',
+                    'Yes' if job.remote else 'No',
+                    job.created_at.strftime('%Y-%m-%d'),
+                    sum(status_counts.values()),
+                    *(status_counts.get(status, 0) for status in statuses),
+                    skills or 'None specified',
+                    salary_range,
+                    days_active
+                ]
+    
+    return exports.csv_response(exports.timestamped('jobs_with_applications'), [
         'Job ID', 'Title', 'Creator', 'Location', 'Remote', 'Posted Date', 
         'Total Applications', 'Applied Status', 'Under Review', 'Interview', 
         'Offer', 'Closed', 'Skills Required', 'Salary Range', 'Days Active'
-    ])
-    
-    for job in queryset:
-        applications = job.applications.all()
-        
-        # Count by status
-        status_counts = {
-            'applied': applications.filter(status='applied').count(),
-            'review': applications.filter(status='review').count(),
-            'interview': applications.filter(status='interview').count(),
-            'offer': applications.filter(status='offer').count(),
-            'closed': applications.filter(status='closed').count(),
-        }
-        
-        skills = ', '.join([skill.name for skill in job.skills.all()])
-        salary_range = 'N/A'
-        if job.min_salary or job.max_salary:
-            min_sal = f"${job.min_salary:,.0f}" if job.min_salary else "N/A"
-            max_sal = f"${job.max_salary:,.0f}" if job.max_salary else "N/A"
-            salary_range = f"{min_sal} - {max_sal}"
-        
-        days_active = (timezone.now().date() - job.created_at.date()).days
-        
-        writer.writerow([
-            job.id,
-            job.title,
-            job.created_by.username,
-            job.location or 'Not specified',
-            'Yes' if job.remote else 'No',
-            job.created_at.strftime('%Y-%m-%d'),
-            applications.count(),
-            status_counts['applied'],
-            status_counts['review'],
-            status_counts['interview'],
-            status_counts['offer'],
-            status_counts['closed'],
-            skills or 'None specified',
-            salary_range,
-            days_active
-        ])
-    
-    return response
+    ], rows())
 
 export_jobs_with_applications.short_description = "Export Jobs with Application Metrics"
 
 def export_skills_demand_analysis(modeladmin, request, queryset):
     """Export skills demand analysis based on selected skills"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="skills_demand_analysis_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
     
-    writer = csv.writer(response)
-    writer.writerow([
-        'Skill Name', 'Jobs Requiring Skill', 'Total Applications to These Jobs',
-        'Users with This Skill', 'Supply vs Demand Ratio', 'Average Salary Range'
-    ])
+    def per_skill(rows):
+        return {skill_id: values for skill_id, *values in rows}
     
-    for skill in queryset:
-        jobs_with_skill = JobPost.objects.filter(skills=skill)
-        total_applications = sum(job.applications.count() for job in jobs_with_skill)
-        users_with_skill = skill.profile_set.count()
-        
-        # Calculate supply vs demand ratio
-        if jobs_with_skill.count() > 0:
-            ratio = users_with_skill / jobs_with_skill.count()
-        else:
-            ratio = 0
-        
-        # Calculate average salary range
-        salaries = []
-        for job in jobs_with_skill:
-            if job.min_salary:
-                salaries.append(float(job.min_salary))
-            if job.max_salary:
-                salaries.append(float(job.max_salary))
-        
-        avg_salary = f"${sum(salaries)/len(salaries):,.0f}" if salaries else "N/A"
-        
-        writer.writerow([
-            skill.name,
-            jobs_with_skill.count(),
-            total_applications,
-            users_with_skill,
-            f"{ratio:.2f}",
-            avg_salary
-        ])
+    def rows():
+        for chunk in exports.chunks(queryset.prefetch_related(None)):
+            skill_ids = [skill.id for skill in chunk]
+            # Jobs, their applications and salaries, and seekers per skill, a query each
+            jobs = per_skill(
+                JobPost.objects.filter(skills__in=skill_ids).order_by().values_list('skills').annotate(
+                    jobs=Count('id'),
+                    salary_total=Sum('min_salary', filter=Q(min_salary__gt=0), default=0)
+                    + Sum('max_salary', filter=Q(max_salary__gt=0), default=0),
+                    salary_count=Count('id', filter=Q(min_salary__gt=0)) + Count('id', filter=Q(max_salary__gt=0)),
+                )
+            )
+            applications = per_skill(
+                Application.objects.filter(job__skills__in=skill_ids).order_by()
+                .values_list('job__skills').annotate(total=Count('id'))
+            )
+            users = per_skill(
+                Profile.skills.through.objects.filter(skill_id__in=skill_ids).order_by()
+                .values_list('skill_id').annotate(total=Count('id'))
+            )
+            
+            for skill in chunk:
+                job_count, salary_total, salary_count = jobs.get(skill.id, (0, 0, 0))
+                total_applications, = applications.get(skill.id, (0,))
+                users_with_skill, = users.get(skill.id, (0,))
+                
+                # Calculate supply vs demand ratio
+                ratio = users_with_skill / job_count if job_count > 0 else 0
+                
+                # Average of the jobs' minimum and maximum salaries
+                avg_salary = f"${float(salary_total) / salary_count:,.0f}" if salary_count else "N/A"
+                
+                yield [
+                    skill.name,
+                    job_count,
+                    total_applications,
+                    users_with_skill,
+                    f"{ratio:.2f}",
+                    avg_salary
+                ]
     
-    return response
+    return exports.csv_response(exports.timestamped('skills_demand_analysis'), [
+        'Skill Name', 'Jobs Requiring Skill', 'Total Applications to These Jobs',
+        'Users with This Skill', 'Supply vs Demand Ratio', 'Average Salary Range'
+    ], rows())
 
 export_skills_demand_analysis.short_description = "Export Skills Demand Analysis"
 
@@ -137,3 +137,11 @@ class SkillAdmin(admin.ModelAdmin):
         return obj.user_count
     user_count.short_description = 'Users with Skill'
     user_count.admin_order_field = 'user_count'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "max_attempts", "run_after", "locked_by", "updated_at")
+    search_fields = ("name", "idempotency_key")
+    list_filter = ("status", "name")
+    readonly_fields = ("locked_by", "locked_at", "last_error", "created_at", "updated_at")
@@ -0,0 +1,44 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import search_cache
+from .models import Profile
+
+
+def skill_postings():
+    """
+    Skill id -> sorted array of visible profile ids, built from the m2m table
+    in one query and cached until a profile's visibility or skills change.
+    """
+    key = f"home:candidate_postings:{search_cache.profile_version()}"
+    postings = cache.get(key)
+    if postings is None:
+        grouped = {}
+        rows = (Profile.skills.through.objects.filter(profile__profile_visible=True)
+                .values_list("skill_id", "profile_id"))
+        for skill_id, profile_id in rows.iterator():
+            grouped.setdefault(skill_id, []).append(profile_id)
+        postings = {skill_id: np.unique(profile_ids) for skill_id, profile_ids in grouped.items()}
+        cache.set(key, postings, None)
+    return postings
+
+
+def ranked_candidates(skill_ids, limit=None):
+    """
+    (profile id, shared skill count) pairs for visible profiles having at
+    least one of skill_ids, most shared skills first (then by id), cut off
+    after limit (CANDIDATE_RECOMMENDATION_LIMIT by default).
+
+    For a given job the score (coverage + bonus per shared skill) only grows
+    with the shared count, so ranking on the count gives the same order.
+    """
+    if limit is None:
+        limit = getattr(settings, "CANDIDATE_RECOMMENDATION_LIMIT", 500)
+    postings = skill_postings()
+    lists = [postings[skill_id] for skill_id in skill_ids if skill_id in postings]
+    if not lists:
+        return []
+    profile_ids, counts = np.unique(np.concatenate(lists), return_counts=True)
+    order = np.lexsort((profile_ids, -counts))[:limit]
+    return list(zip(profile_ids[order].tolist(), counts[order].tolist()))
@@ -0,0 +1,103 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import search_cache
+from .geo import batch_distances, within_distance
+from .models import JobPost
+
+# "At least $X" buckets, matching the min_salary filter
+SALARY_THRESHOLDS = (50000, 100000, 150000, 200000)
+
+
+def skill_postings():
+    """
+    Skill id -> sorted array of job ids, built from the m2m table in one
+    query and cached until the catalog changes.
+    """
+    key = f"home:skill_postings:{search_cache.catalog_version()}"
+    postings = cache.get(key)
+    if postings is None:
+        grouped = {}
+        rows = JobPost.skills.through.objects.values_list("skill_id", "jobpost_id")
+        for skill_id, job_id in rows.iterator():
+            grouped.setdefault(skill_id, []).append(job_id)
+        postings = {skill_id: np.unique(job_ids) for skill_id, job_ids in grouped.items()}
+        cache.set(key, postings, None)
+    return postings
+
+
+def facet_counts(params, unfaceted_jobs):
+    """
+    Counts per skill, remote/on-site, visa and salary bucket for the current
+    filters, cached per filter signature for FACETS_CACHE_TTL seconds.
+
+    unfaceted_jobs is the filtered queryset *without* the remote, visa and
+    min_salary filters; each of those facets is counted as if its own
+    filter were not applied, so picking one value doesn't zero the others.
+    """
+    key = search_cache.make_key("facets", params)
+    counts = cache.get(key)
+    if counts is None:
+        counts = _compute(params, unfaceted_jobs)
+        cache.set(key, counts, getattr(settings, "FACETS_CACHE_TTL", 300))
+    return counts
+
+
+def _compute(params, unfaceted_jobs):
+    rows = list(unfaceted_jobs.values_list(
+        "id", "remote", "visa_sponsorship", "min_salary", "latitude", "longitude"
+    ))
+    if params["max_distance_miles"] is not None:
+        lat, lon = params["origin"]
+        distances = dict(batch_distances(
+            lat, lon, [row[0] for row in rows], [row[4] for row in rows], [row[5] for row in rows]
+        ))
+        rows = [row for row in rows
+                if within_distance(distances.get(row[0]), row[1], params["max_distance_miles"])]
+
+    remote = params["remote"]
+    visa = params["visa"]
+    try:
+        min_salary = float(params["min_salary"]) if params["min_salary"] else None
+    except ValueError:
+        min_salary = None
+
+    def remote_ok(row):
+        return not remote or row[1] == (remote == "remote")
+
+    def visa_ok(row):
+        return not visa or row[2] == (visa == "yes")
+
+    def salary_ok(row):
+        return min_salary is None or (row[3] is not None and row[3] >= min_salary)
+
+    counts = {
+        "total": 0,
+        "remote": {"remote": 0, "onsite": 0},
+        "visa": {"yes": 0, "no": 0},
+        "salary": {threshold: 0 for threshold in SALARY_THRESHOLDS},
+        "skills": {},
+    }
+    result_ids = []
+    for row in rows:
+        in_remote, in_visa, in_salary = remote_ok(row), visa_ok(row), salary_ok(row)
+        if in_visa and in_salary:
+            counts["remote"]["remote" if row[1] else "onsite"] += 1
+        if in_remote and in_salary:
+            counts["visa"]["yes" if row[2] else "no"] += 1
+        if in_remote and in_visa and row[3] is not None:
+            for threshold in SALARY_THRESHOLDS:
+                if row[3] >= threshold:
+                    counts["salary"][threshold] += 1
+        if in_remote and in_visa and in_salary:
+            result_ids.append(row[0])
+
+    counts["total"] = len(result_ids)
+    if result_ids:
+        result_ids = np.unique(np.asarray(result_ids, dtype=np.int64))
+        for skill_id, job_ids in skill_postings().items():
+            matched = int(np.isin(job_ids, result_ids, assume_unique=True).sum())
+            if matched:
+                counts["skills"][skill_id] = matched
+    return counts
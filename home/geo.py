@@ -0,0 +1,169 @@
+from math import radians, sin, cos, sqrt, atan2, asin, degrees
+
+import numpy as np
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371
+MILES_PER_KM = 0.621371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_KM
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return R * c
+
+
+def batch_distances(origin_lat, origin_lon, ids, lats, lons, max_km=None):
+    """
+    Great-circle distances from one origin to many points in one NumPy pass.
+
+    Returns (id, distance_km) pairs sorted nearest first. Points without
+    coordinates (None) are dropped, as are points beyond max_km when given.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not ids.size:
+        return []
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    lon2 = np.radians(np.asarray(lons, dtype=float))
+    lat1 = radians(origin_lat)
+    lon1 = radians(origin_lon)
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    dist = 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    keep = ~np.isnan(dist)
+    if max_km is not None:
+        keep &= dist <= max_km
+    ids = ids[keep]
+    dist = dist[keep]
+    order = np.argsort(dist, kind="stable")
+    return list(zip(ids[order].tolist(), dist[order].tolist()))
+
+
+def within_distance(distance_km, remote, max_distance_miles):
+    """Exact radius check (compare in miles), but always include remote jobs"""
+    if remote:
+        return True
+    return bool(distance_km) and round(distance_km * MILES_PER_KM, 2) <= max_distance_miles
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Return (min_lat, max_lat, lon_ranges) enclosing a circle of radius_km.
+
+    lon_ranges is a list of (min_lon, max_lon) tuples because a box that
+    crosses the antimeridian has to be split in two.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = degrees(angular)
+    min_lat = max(lat - dlat, -90.0)
+    max_lat = min(lat + dlat, 90.0)
+
+    # Near the poles every longitude is within reach
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    # Widest longitude span of the circle (it sits poleward of the centre)
+    ratio = sin(angular) / cos(radians(lat))
+    if ratio >= 1.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    dlon = degrees(asin(ratio))
+
+    min_lon = lon - dlon
+    max_lon = lon + dlon
+    if min_lon < -180.0:
+        return min_lat, max_lat, [(min_lon + 360.0, 180.0), (-180.0, max_lon)]
+    if max_lon > 180.0:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def bounding_box_q(lat, lon, radius_miles):
+    """Q object matching jobs whose coordinates fall in the radius' bounding box"""
+    min_lat, max_lat, lon_ranges = bounding_box(lat, lon, radius_miles / MILES_PER_KM)
+    lon_q = Q()
+    for min_lon, max_lon in lon_ranges:
+        lon_q |= Q(longitude__range=(min_lon, max_lon))
+    return Q(latitude__range=(min_lat, max_lat)) & lon_q
+
+
+def prefilter_by_radius(jobs, lat, lon, radius_miles):
+    """
+    Narrow a JobPost queryset to remote jobs plus jobs inside the bounding box
+    of the search radius. The box is served by the (latitude, longitude) index
+    so only nearby rows are left for the exact haversine check.
+    """
+    # Small pad so rows that only pass after distances are rounded aren't lost
+    return jobs.filter(Q(remote=True) | bounding_box_q(lat, lon, radius_miles + 0.01))
+
+
+def parse_bbox(value):
+    """Parse a Leaflet "west,south,east,north" bounds string; None if invalid"""
+    if not value:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError:
+        return None
+    if south > north:
+        return None
+    return west, south, east, north
+
+
+def viewport_q(west, south, east, north):
+    """
+    Q object for a map viewport. Leaflet longitudes run past +/-180 once the
+    map has been panned around the globe, so they are wrapped (and split when
+    the viewport straddles the antimeridian).
+    """
+    lat_q = Q(latitude__range=(south, north))
+    if east - west >= 360.0:
+        return lat_q
+    west = (west + 180.0) % 360.0 - 180.0
+    east = (east + 180.0) % 360.0 - 180.0
+    if west <= east:
+        return lat_q & Q(longitude__range=(west, east))
+    return lat_q & (Q(longitude__gte=west) | Q(longitude__lte=east))
+
+
+def cell_size_for_zoom(zoom, cells_per_tile=4):
+    """Grid cell size in degrees giving roughly 64px cells on 256px map tiles"""
+    return 360.0 / (2 ** zoom) / cells_per_tile
+
+
+def grid_clusters(ids, lats, lons, cell_size, samples=5):
+    """
+    Bucket points into a cell_size-degree grid in one NumPy pass.
+
+    Returns one dict per occupied cell with the point count, the centroid and
+    up to `samples` ids, taken in input order (so callers pass newest first).
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not ids.size:
+        return []
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    cells = np.stack([np.floor(lats / cell_size), np.floor(lons / cell_size)], axis=1)
+    _, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    counts = np.bincount(inverse)
+    lat_centroids = np.bincount(inverse, weights=lats) / counts
+    lon_centroids = np.bincount(inverse, weights=lons) / counts
+
+    # Group ids by cell, keeping input order inside each cell
+    grouped = ids[np.argsort(inverse, kind="stable")]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    return [
+        {
+            "count": int(count),
+            "lat": float(lat),
+            "lon": float(lon),
+            "ids": grouped[start:start + min(count, samples)].tolist(),
+        }
+        for count, lat, lon, start in zip(counts, lat_centroids, lon_centroids, starts)
+    ]
@@ -0,0 +1,92 @@
+"""
+Keyword queries over profile text, shared by the FTS5 profile index
+(home.profile_search) and the in-memory saved-search matcher
+(accounts.matching). Nothing here touches the database (or Django).
+
+A query is a list of alternatives separated by OR; an alternative is a list
+of comma-separated keywords that must all match. A keyword matches as a
+phrase of whole words, the last of which may be a prefix: "machine learn"
+matches "Machine Learning" but not "learning machines".
+
+The same tokenizer serves the job search (home.search). Both FTS5 tables
+are created with FTS_TOKENIZER, so "C++", "C#" and ".NET" stay words of
+their own instead of becoming "c" and "net", and a one-letter word such as
+"R" only matches whole.
+"""
+import re
+import unicodedata
+
+# Profile fields searched by keyword, with the privacy flag hiding each
+PROFILE_FIELDS = {
+    "headline": "show_headline",
+    "education": "show_education",
+    "work_experience": "show_work_experience",
+}
+
+# The tokenize option of the FTS5 tables (see migrations 0014 and 0015)
+FTS_TOKENIZER = "unicode61 remove_diacritics 2 tokenchars '+#.'"
+
+# Words as FTS_TOKENIZER sees them: letters, digits and the tokenchars
+TOKEN_RE = re.compile(r"(?:[^\W_]|[+#.])+", re.UNICODE)
+OR_RE = re.compile(r"\s+OR\s+|\|")
+
+# Shorter words only match whole: "r" is the language, not every word starting with r
+MIN_PREFIX_LENGTH = 2
+
+
+def tokens(text):
+    """Lowercased words of text with diacritics removed, like remove_diacritics 2"""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return tuple(TOKEN_RE.findall(text))
+
+
+def query_tokens(text):
+    """
+    tokens() of search input, without sentence-ending dots (the prefix match
+    still finds "python." for "python") or words with no letter or digit
+    """
+    words = (word.rstrip(".") for word in tokens(text))
+    return tuple(word for word in words if any(ch.isalnum() for ch in word))
+
+
+def fts_phrase(words):
+    """
+    The words as one quoted FTS5 phrase, its last word a prefix unless it is
+    too short. Words from tokens() hold no quotes, so user input can't
+    inject syntax.
+    """
+    prefix = "*" if len(words[-1]) >= MIN_PREFIX_LENGTH else ""
+    return '"' + " ".join(words) + '"' + prefix
+
+
+def parse(text):
+    """
+    Alternatives of text, each a list of phrases (tuples of words). Keywords
+    without any word are dropped; an empty list means no constraint.
+    """
+    alternatives = []
+    for alternative in OR_RE.split(text or ""):
+        phrases = [phrase for phrase in (query_tokens(keyword) for keyword in alternative.split(",")) if phrase]
+        if phrases:
+            alternatives.append(phrases)
+    return alternatives
+
+
+def _phrase_in(phrase, words):
+    if len(phrase[-1]) < MIN_PREFIX_LENGTH:
+        size = len(phrase)
+        return any(words[start:start + size] == phrase for start in range(len(words) - size + 1))
+    exact, prefix = phrase[:-1], phrase[-1]
+    last = len(exact)
+    return any(
+        words[start:start + last] == exact and words[start + last].startswith(prefix)
+        for start in range(len(words) - last)
+    )
+
+
+def matches(alternatives, words):
+    """Whether the tokens words satisfy the parsed query"""
+    if not alternatives:
+        return True
+    return any(all(_phrase_in(phrase, words) for phrase in phrases) for phrases in alternatives)
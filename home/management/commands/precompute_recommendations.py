@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from home import recommendation_batch, recommendations, skill_bits
+from home.models import JobPost, Profile, RecommendedJob
+
+
+class Command(BaseCommand):
+    help = 'Precompute the stored job recommendations of every job seeker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 scores in this process)')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Seekers scored per task')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per bulk_create')
+
+    def handle(self, *args, **options):
+        """Score all seekers against one job snapshot and replace home.RecommendedJob"""
+        started = time.monotonic()
+
+        # Read-only snapshot of the approved jobs, shared by every worker
+        snapshot = recommendation_batch.job_snapshot(
+            [(job_id, skill_bits.unpack(bits)) for job_id, bits in
+             JobPost.objects.filter(approved=True).values_list('id', 'skill_bits')],
+            recommendations.NO_SKILLS_SCORE,
+            recommendations.SKILL_BONUS,
+        )
+        seekers = [(user_id, skill_bits.unpack(bits)) for user_id, bits in
+                   Profile.objects.exclude(skill_bits=b'').values_list('user_id', 'skill_bits')]
+        chunk_size = max(1, options['chunk_size'])
+        chunks = [seekers[i:i + chunk_size] for i in range(0, len(seekers), chunk_size)]
+
+        pool = None
+        if options['workers'] > 1 and len(chunks) > 1:
+            # Workers never touch the database; don't hand them open connections
+            connections.close_all()
+            pool = multiprocessing.Pool(
+                options['workers'],
+                initializer=recommendation_batch.init_worker,
+                initargs=(snapshot,),
+            )
+            scored = pool.imap_unordered(recommendation_batch.score_chunk, chunks)
+        else:
+            scored = (recommendation_batch.score_chunk(chunk, snapshot) for chunk in chunks)
+
+        stored = 0
+        try:
+            with transaction.atomic():
+                RecommendedJob.objects.all().delete()
+                for rows in scored:
+                    RecommendedJob.objects.bulk_create(
+                        [RecommendedJob(user_id=user_id, job_id=job_id, score=score, common=common, missing=missing)
+                         for user_id, job_id, score, common, missing in rows],
+                        batch_size=options['batch_size'],
+                    )
+                    stored += len(rows)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        elapsed = time.monotonic() - started
+        rate = len(seekers) / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Stored {stored} recommendations for {len(seekers)} seekers '
+                f'in {elapsed:.2f}s ({rate:.0f} seekers/s)'
+            )
+        )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from home import profile_search, search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes for job posts and profiles'
+
+    def handle(self, *args, **options):
+        """Repopulate the FTS5 tables from every JobPost and Profile in bulk"""
+        if not search.is_available():
+            raise CommandError('Full-text search requires the SQLite backend')
+
+        started = time.monotonic()
+        indexed = search.rebuild_index()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} job posts in {elapsed:.2f}s')
+        )
+
+        started = time.monotonic()
+        indexed = profile_search.rebuild_index()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} visible profiles in {elapsed:.2f}s')
+        )
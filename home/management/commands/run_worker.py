@@ -0,0 +1,94 @@
+import datetime
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from home import task_queue
+
+# Seconds between deletions of old finished tasks
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the database task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Tasks run at the same time, each in its own thread')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when no task is due')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no task is due instead of polling')
+        parser.add_argument('--keep-days', type=float,
+                            default=getattr(settings, 'TASK_RETENTION_DAYS', 7),
+                            help='Delete finished tasks older than this when idle (0 keeps them)')
+
+    def handle(self, *args, **options):
+        """Claim and run due tasks until interrupted (or drained, with --once)"""
+        task_queue.autodiscover()
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.done = self.failed = 0
+        self.next_prune = 0
+        base = f'{socket.gethostname()}:{os.getpid()}'
+        concurrency = max(1, options['concurrency'])
+
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=self.work, args=(f'{base}:{n}', options), daemon=True)
+            for n in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the running tasks finish...')
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Ran {self.done + self.failed} tasks ({self.failed} failed) in {elapsed:.2f}s')
+        )
+
+    def work(self, worker, options):
+        try:
+            while not self.stopping.is_set():
+                tasks = task_queue.claim(worker)
+                if not tasks:
+                    self.prune(options)
+                    if options['once']:
+                        return
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+                for task in tasks:
+                    ok = task_queue.run(task)
+                    with self.lock:
+                        if ok:
+                            self.done += 1
+                        else:
+                            self.failed += 1
+                            self.stderr.write(f'Task {task.name} #{task.id} failed (attempt {task.attempts})')
+        finally:
+            # Each thread has its own database connection
+            connection.close()
+
+    def prune(self, options):
+        """Delete old finished tasks, at most once per PRUNE_INTERVAL across threads"""
+        if options['keep_days'] <= 0:
+            return
+        with self.lock:
+            if time.monotonic() < self.next_prune:
+                return
+            self.next_prune = time.monotonic() + PRUNE_INTERVAL
+        deleted = task_queue.prune(datetime.timedelta(days=options['keep_days']))
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} finished tasks older than {options["keep_days"]:g} days')
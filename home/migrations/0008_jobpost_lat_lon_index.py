@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_make_commute_radius_optional'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobpost',
+            index=models.Index(fields=['latitude', 'longitude'], name='home_jobpost_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS home_jobpost_fts USING fts5(
+    title, description, location, skills,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+POPULATE_SQL = """
+INSERT INTO home_jobpost_fts(rowid, title, description, location, skills)
+SELECT j.id, j.title, j.description, j.location,
+       COALESCE((SELECT group_concat(s.name, ' ') FROM home_jobpost_skills js
+                 JOIN home_skill s ON s.id = js.skill_id WHERE js.jobpost_id = j.id), '')
+FROM home_jobpost j
+"""
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS home_jobpost_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_jobpost_lat_lon_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+def populate_skill_bits(apps, schema_editor):
+    for model_name, owner in (("JobPost", "jobpost_id"), ("Profile", "profile_id")):
+        model = apps.get_model("home", model_name)
+        masks = {}
+        for owner_id, skill_id in model.skills.through.objects.values_list(owner, "skill_id"):
+            masks[owner_id] = masks.get(owner_id, 0) | (1 << skill_id)
+        model.objects.bulk_update(
+            [model(id=owner_id, skill_bits=mask.to_bytes((mask.bit_length() + 7) // 8, "little"))
+             for owner_id, mask in masks.items()],
+            ["skill_bits"],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_jobpost_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobpost',
+            name='skill_bits',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='skill_bits',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(populate_skill_bits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_recommendations(apps, schema_editor):
+    """Same scores as home.recommendations.match_score, from the skill bitmasks"""
+    Profile = apps.get_model("home", "Profile")
+    JobPost = apps.get_model("home", "JobPost")
+    RecommendedJob = apps.get_model("home", "RecommendedJob")
+
+    def unpack(data):
+        return int.from_bytes(data or b"", "little")
+
+    def pack(mask):
+        return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+    jobs = [(job_id, unpack(bits)) for job_id, bits in
+            JobPost.objects.filter(approved=True).values_list("id", "skill_bits")]
+    rows = []
+    for user_id, bits in Profile.objects.exclude(skill_bits=b"").values_list("user_id", "skill_bits"):
+        profile_mask = unpack(bits)
+        for job_id, job_mask in jobs:
+            common = bin(profile_mask & job_mask).count("1")
+            total = bin(job_mask).count("1")
+            if not total:
+                score = 0.1
+            elif common:
+                score = common / total + common * 0.1
+            else:
+                continue
+            rows.append(RecommendedJob(user_id=user_id, job_id=job_id, score=score,
+                                       common=pack(profile_mask & job_mask),
+                                       missing=pack(job_mask & ~profile_mask)))
+    RecommendedJob.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('home', '0010_skill_bits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendedJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('common', models.BinaryField(default=b'')),
+                ('missing', models.BinaryField(default=b'')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='home.jobpost')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-score', 'job'], name='home_recjob_user_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recommendedjob',
+            constraint=models.UniqueConstraint(fields=('user', 'job'), name='home_recommendedjob_user_job_uniq'),
+        ),
+        migrations.RunPython(populate_recommendations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS home_profile_fts USING fts5(
+    headline, education, work_experience,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+POPULATE_SQL = """
+INSERT INTO home_profile_fts(rowid, headline, education, work_experience)
+SELECT p.id,
+       CASE WHEN p.show_headline THEN p.headline ELSE '' END,
+       CASE WHEN p.show_education THEN p.education ELSE '' END,
+       CASE WHEN p.show_work_experience THEN p.work_experience ELSE '' END
+FROM home_profile p
+WHERE p.profile_visible
+"""
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS home_profile_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0012_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+# Keep "+", "#" and "." inside words, so "C++", "C#" and ".NET" are searchable
+# (see home.keywords.FTS_TOKENIZER)
+CREATE_SQL = """
+CREATE VIRTUAL TABLE home_jobpost_fts USING fts5(
+    title, description, location, skills,
+    tokenize = "{tokenizer}",
+    prefix = '2 3'
+)
+"""
+
+POPULATE_SQL = """
+INSERT INTO home_jobpost_fts(rowid, title, description, location, skills)
+SELECT j.id, j.title, j.description, j.location,
+       COALESCE((SELECT group_concat(s.name, ' ') FROM home_jobpost_skills js
+                 JOIN home_skill s ON s.id = js.skill_id WHERE js.jobpost_id = j.id), '')
+FROM home_jobpost j
+"""
+
+
+def _recreate(schema_editor, tokenizer):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS home_jobpost_fts")
+    schema_editor.execute(CREATE_SQL.format(tokenizer=tokenizer))
+    schema_editor.execute(POPULATE_SQL)
+
+
+def keep_symbols(apps, schema_editor):
+    _recreate(schema_editor, "unicode61 remove_diacritics 2 tokenchars '+#.'")
+
+
+def split_symbols(apps, schema_editor):
+    _recreate(schema_editor, "unicode61 remove_diacritics 2")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0013_profile_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_symbols, split_symbols),
+    ]
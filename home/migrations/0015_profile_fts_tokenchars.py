@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+# Tokenized like home_jobpost_fts since 0014 (see home.keywords.FTS_TOKENIZER)
+CREATE_SQL = """
+CREATE VIRTUAL TABLE home_profile_fts USING fts5(
+    headline, education, work_experience,
+    tokenize = "{tokenizer}",
+    prefix = '2 3'
+)
+"""
+
+POPULATE_SQL = """
+INSERT INTO home_profile_fts(rowid, headline, education, work_experience)
+SELECT p.id,
+       CASE WHEN p.show_headline THEN p.headline ELSE '' END,
+       CASE WHEN p.show_education THEN p.education ELSE '' END,
+       CASE WHEN p.show_work_experience THEN p.work_experience ELSE '' END
+FROM home_profile p
+WHERE p.profile_visible
+"""
+
+
+def _recreate(schema_editor, tokenizer):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS home_profile_fts")
+    schema_editor.execute(CREATE_SQL.format(tokenizer=tokenizer))
+    schema_editor.execute(POPULATE_SQL)
+
+
+def keep_symbols(apps, schema_editor):
+    _recreate(schema_editor, "unicode61 remove_diacritics 2 tokenchars '+#.'")
+
+
+def split_symbols(apps, schema_editor):
+    _recreate(schema_editor, "unicode61 remove_diacritics 2")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0014_jobpost_fts_tokenchars'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_symbols, split_symbols),
+    ]
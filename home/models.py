@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models
 
+from . import skill_bits
 
 
 class Profile(models.Model):
@@ -29,10 +30,17 @@ class Profile(models.Model):
     show_location = models.BooleanField(default=True, help_text="Show location to recruiters")
     profile_visible = models.BooleanField(default=True, help_text="Make profile visible to recruiters in search")
 
+    # Denormalized skills bitmask, maintained by home.signals (see home.skill_bits)
+    skill_bits = models.BinaryField(default=b"", editable=False)
+
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
+
+    @property
+    def skill_mask(self):
+        return skill_bits.unpack(self.skill_bits)
 class Skill(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
@@ -61,9 +69,22 @@ class JobPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=True)
 
+    # Denormalized skills bitmask, maintained by home.signals (see home.skill_bits)
+    skill_bits = models.BinaryField(default=b"", editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the bounding-box prefilter in home.geo.prefilter_by_radius
+            models.Index(fields=["latitude", "longitude"], name="home_jobpost_lat_lon_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
+    @property
+    def skill_mask(self):
+        return skill_bits.unpack(self.skill_bits)
+
 class Application(models.Model):
     APPLIED = "applied"
     REVIEW = "review"
@@ -95,3 +116,84 @@ class Application(models.Model):
     def __str__(self):
         who = self.applicant.username if self.applicant else "Anonymous"
         return f"{who} -> {self.job.title} ({self.get_status_display()})"
+
+
+class RecommendedJob(models.Model):
+    """
+    Materialized job_recommendations score of one approved job for one
+    seeker, kept current by home.signals (see home.recommendations.refresh).
+    common and missing are packed skill bitmasks like skill_bits.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recommended_jobs")
+    job = models.ForeignKey(JobPost, on_delete=models.CASCADE, related_name="recommendations")
+    score = models.FloatField()
+    common = models.BinaryField(default=b"")
+    missing = models.BinaryField(default=b"")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "job"], name="home_recommendedjob_user_job_uniq"),
+        ]
+        indexes = [
+            # Serves the best-first read in job_recommendations
+            models.Index(fields=["user", "-score", "job"], name="home_recjob_user_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} for {self.user_id} ({self.score:.2f})"
+
+    @property
+    def common_mask(self):
+        return skill_bits.unpack(self.common)
+
+    @property
+    def missing_mask(self):
+        return skill_bits.unpack(self.missing)
+
+
+class Task(models.Model):
+    """
+    A unit of background work stored in the database and executed by the
+    run_worker command (see home.task_queue).
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    # At most one pending task per key, so repeated enqueues collapse into one
+    idempotency_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["idempotency_key"],
+                condition=models.Q(status="pending"),
+                name="home_task_pending_key_uniq",
+            ),
+        ]
+        indexes = [
+            # Serves the worker's claim query
+            models.Index(fields=["status", "run_after"], name="home_task_status_run_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,113 @@
+import base64
+import binascii
+import json
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def page_size_from(request):
+    """Page size from ?per_page=, clamped to the configured bounds"""
+    default = getattr(settings, "JOB_LIST_PAGE_SIZE", 20)
+    maximum = getattr(settings, "JOB_LIST_MAX_PAGE_SIZE", 100)
+    try:
+        size = int(request.GET.get("per_page") or default)
+    except ValueError:
+        size = default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(sort, key):
+    """Opaque cursor for the last row of a page; key is that row's sort key"""
+    payload = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """Sort key stored in a cursor, or None if missing, malformed or for another sort"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(payload, dict) or payload.get("s") != sort or not isinstance(payload.get("k"), list):
+        return None
+    return payload["k"]
+
+
+def keyset_page(ordered, cursor_key, page_size, sort, key, after, refine=None):
+    """
+    One page of an already ordered queryset, keyset-paginated.
+
+    key(row) is a row's sort key (what goes into the cursor) and
+    after(ordered, key) narrows ordered to the rows following that key.
+    Only page-sized batches are ever fetched, so deep result sets are
+    streamed rather than loaded. refine(batch) may drop rows in Python
+    (e.g. the exact distance check); batches are then pulled until the page
+    is full, so a page is never short just because SQL let extra rows
+    through. Returns (rows, next_cursor).
+    """
+    remaining = ordered if cursor_key is None else after(ordered, cursor_key)
+    batch_size = page_size + 1 if refine is None else max(page_size * 2, 50)
+    rows = []
+    while True:
+        batch = list(remaining[:batch_size])
+        rows.extend(batch if refine is None else refine(batch))
+        if len(batch) < batch_size or len(rows) > page_size:
+            break
+        remaining = after(ordered, key(batch[-1]))
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(sort, key(rows[-1]))
+    return rows, next_cursor
+
+
+def _after_newest(field):
+    def after(queryset, key):
+        value, last_id = parse_datetime(key[0]), key[1]
+        return queryset.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": last_id}))
+    return after
+
+
+def newest_first_page(queryset, cursor, page_size, refine=None, field="created_at"):
+    """
+    One page of queryset ordered newest first, keyset-paginated on
+    (field, id); field is a datetime, created_at by default. See keyset_page
+    for refine. Returns (rows, next_cursor).
+    """
+    cursor_key = None
+    if cursor:
+        try:
+            value, last_id = parse_datetime(cursor[0]), int(cursor[1])
+        except (IndexError, TypeError, ValueError):
+            value = None
+        if value is not None:
+            cursor_key = (cursor[0], last_id)
+
+    rows, next_cursor = keyset_page(
+        queryset.order_by(f"-{field}", "-id"), cursor_key, page_size, "newest",
+        key=lambda row: (getattr(row, field).isoformat(), row.id), after=_after_newest(field), refine=refine,
+    )
+    return rows, next_cursor
+
+
+def seek(keys, cursor, page_size, sort):
+    """
+    Slice a sorted list of sort keys (each ending in the row id) to the page
+    after cursor. Returns (page_keys, next_cursor).
+    """
+    try:
+        start = bisect_right(keys, tuple(cursor)) if cursor else 0
+    except TypeError:
+        start = 0
+    page_keys = keys[start:start + page_size]
+    next_cursor = None
+    if start + page_size < len(keys):
+        next_cursor = encode_cursor(sort, page_keys[-1])
+    return page_keys, next_cursor
@@ -0,0 +1,160 @@
+"""
+Keyword search over seekers' headline, education and work experience.
+
+On SQLite the fields are kept in an FTS5 table (see migration 0013) holding
+only what recruiters may see: a row per visible profile, with the fields
+its owner hides left empty. Keyword queries (see home.keywords) become index
+lookups ranked with bm25; other backends fall back to icontains filters.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from . import keywords
+from .models import Profile
+
+FTS_TABLE = "home_profile_fts"
+
+# Indexed fields, in table column order, with the privacy flag hiding each
+COLUMNS = keywords.PROFILE_FIELDS
+
+# bm25() column weights, in table column order
+BM25_WEIGHTS = (5.0, 1.0, 2.0)
+
+
+def is_available():
+    """The FTS5 table only exists on SQLite (see migration 0013)"""
+    return connection.vendor == "sqlite"
+
+
+def _query(alternatives):
+    return " OR ".join(
+        "(" + " AND ".join(keywords.fts_phrase(phrase) for phrase in phrases) + ")" for phrases in alternatives
+    )
+
+
+def match_expression(text=None, **fields):
+    """
+    Build an FTS5 MATCH expression: text is matched against every column,
+    each keyword argument (headline=..., education=..., work_experience=...)
+    only against its own column. Returns None when nothing searchable was given.
+    """
+    clauses = []
+    alternatives = keywords.parse(text)
+    if alternatives:
+        clauses.append(f"({_query(alternatives)})")
+    for field, value in fields.items():
+        alternatives = keywords.parse(value)
+        if alternatives:
+            clauses.append(f"{{{field}}} : ({_query(alternatives)})")
+    return " AND ".join(clauses) or None
+
+
+def match_subquery(expression):
+    """Subquery of matching profile ids, for use as id__in=..."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (expression,))
+
+
+def ranked_profiles(expression):
+    """(profile id, bm25 score) pairs matching the expression, best (lowest) score first"""
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY score",
+            [expression],
+        )
+        return cursor.fetchall()
+
+
+def keyword_filter(field, text):
+    """
+    Q for the fallback without an index: the query's keywords as icontains
+    lookups on one field, which must not be hidden
+    """
+    alternatives = keywords.parse(text)
+    if not alternatives:
+        return Q()
+    any_alternative = Q()
+    for phrases in alternatives:
+        every_phrase = Q()
+        for phrase in phrases:
+            every_phrase &= Q(**{f"{field}__icontains": " ".join(phrase)})
+        any_alternative |= every_phrase
+    return Q(**{COLUMNS[field]: True}) & any_alternative
+
+
+def filter_profiles(queryset, text=None, **fields):
+    """
+    Restrict a Profile queryset to profiles matching the keyword queries
+    (see match_expression), through the index when there is one
+    """
+    if is_available():
+        expression = match_expression(text, **fields)
+        return queryset.filter(id__in=match_subquery(expression)) if expression else queryset
+    if keywords.parse(text):
+        queryset = queryset.filter(Q(*(keyword_filter(field, text) for field in COLUMNS), _connector=Q.OR))
+    for field, value in fields.items():
+        queryset = queryset.filter(keyword_filter(field, value))
+    return queryset
+
+
+def ranked(profiles, text=None, **fields):
+    """
+    The profiles (already filtered with filter_profiles) as a list, most
+    relevant first. Without an index or keywords their order is kept.
+    """
+    expression = match_expression(text, **fields) if is_available() else None
+    if not expression:
+        return list(profiles)
+    scores = dict(ranked_profiles(expression))
+    return sorted(profiles, key=lambda profile: scores.get(profile.id, 0.0))
+
+
+def _document_select(where=""):
+    # Hidden fields are indexed as empty, invisible profiles not at all
+    columns = ", ".join(
+        f"CASE WHEN p.{flag} THEN p.{field} ELSE '' END" for field, flag in COLUMNS.items()
+    )
+    where = f"{where} AND p.profile_visible" if where else "WHERE p.profile_visible"
+    return f"SELECT p.id, {columns} FROM {Profile._meta.db_table} p {where}"
+
+
+def _insert():
+    return f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) "
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def index_profiles(profile_ids):
+    """(Re)index the given profiles; ids that no longer exist or are hidden are just removed"""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(profile_ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(_insert() + _document_select(f"WHERE p.id IN ({placeholders})"), chunk)
+
+
+def remove_profiles(profile_ids):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(profile_ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index():
+    """Repopulate the whole index from Profile in one statement. Returns the row count."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_insert() + _document_select())
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
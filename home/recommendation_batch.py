@@ -0,0 +1,79 @@
+"""
+Scoring of many seekers at once against a read-only snapshot of the
+approved jobs, for the precompute_recommendations command. Nothing here
+touches the database (or Django), so chunks can be scored in pool workers.
+"""
+import numpy as np
+
+from . import skill_bits
+
+# Set in each pool worker by init_worker
+_snapshot = None
+
+
+def job_snapshot(jobs, no_skills_score, skill_bonus):
+    """
+    Pack (job id, skill mask) pairs into arrays: a jobs x skills 0/1 matrix
+    so a chunk of seekers is scored with one matrix product.
+    """
+    job_ids = np.array([job_id for job_id, _ in jobs], dtype=np.int64)
+    masks = [mask for _, mask in jobs]
+    columns = sorted({skill_id for mask in masks for skill_id in skill_bits.skill_ids(mask)})
+    column_of = {skill_id: i for i, skill_id in enumerate(columns)}
+
+    matrix = np.zeros((len(masks), len(columns)), dtype=np.int32)
+    for row, mask in enumerate(masks):
+        for skill_id in skill_bits.skill_ids(mask):
+            matrix[row, column_of[skill_id]] = 1
+
+    return {
+        "job_ids": job_ids,
+        "masks": masks,
+        "matrix": matrix,
+        "skill_counts": matrix.sum(axis=1),
+        "column_of": column_of,
+        "no_skills_score": no_skills_score,
+        "skill_bonus": skill_bonus,
+    }
+
+
+def init_worker(snapshot):
+    global _snapshot
+    _snapshot = snapshot
+
+
+def score_chunk(profiles, snapshot=None):
+    """
+    (user id, job id, score, common, missing) rows for a chunk of
+    (user id, skill mask) seekers, matching home.recommendations.match_score:
+    jobs sharing a skill, plus jobs listing none.
+    """
+    snapshot = snapshot or _snapshot
+    column_of = snapshot["column_of"]
+    vectors = np.zeros((len(profiles), len(column_of)), dtype=np.int32)
+    for row, (_, mask) in enumerate(profiles):
+        for skill_id in skill_bits.skill_ids(mask):
+            if skill_id in column_of:
+                vectors[row, column_of[skill_id]] = 1
+
+    common = vectors @ snapshot["matrix"].T
+    totals = snapshot["skill_counts"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = common / totals + common * snapshot["skill_bonus"]
+    scores = np.where(totals == 0, snapshot["no_skills_score"], scores)
+    keep = (common > 0) | (totals == 0)
+
+    rows = []
+    job_ids = snapshot["job_ids"]
+    masks = snapshot["masks"]
+    for row, col in zip(*np.nonzero(keep)):
+        user_id, profile_mask = profiles[row]
+        job_mask = masks[col]
+        rows.append((
+            user_id,
+            int(job_ids[col]),
+            float(scores[row, col]),
+            skill_bits.pack(profile_mask & job_mask),
+            skill_bits.pack(job_mask & ~profile_mask),
+        ))
+    return rows
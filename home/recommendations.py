@@ -0,0 +1,168 @@
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+from . import pagination, skill_bits
+from .models import JobPost, Profile, RecommendedJob
+
+# A job that lists no skills is still shown, just below any real match
+NO_SKILLS_SCORE = 0.1
+# Added per shared skill on top of the coverage ratio
+SKILL_BONUS = 0.1
+
+
+def match_score(common_count, skill_count):
+    """Python twin of the score computed by scored_jobs"""
+    if not skill_count:
+        return NO_SKILLS_SCORE
+    return common_count / skill_count + common_count * SKILL_BONUS
+
+
+def scored_jobs(skill_ids):
+    """
+    Approved jobs sharing at least one of skill_ids, plus jobs listing no
+    skills, annotated in one aggregated query with skill_count, common_count
+    and score (share of the job's skills covered + SKILL_BONUS per shared
+    skill). Best score first.
+    """
+    shared = JobPost.skills.through.objects.filter(skill_id__in=skill_ids).values("jobpost_id")
+    return (
+        JobPost.objects.filter(approved=True)
+        .filter(Q(id__in=shared) | Q(skill_bits=b""))
+        .annotate(
+            skill_count=Count("skills"),
+            common_count=Count("skills", filter=Q(skills__in=skill_ids)),
+        )
+        .annotate(score=Case(
+            When(skill_count=0, then=Value(NO_SKILLS_SCORE)),
+            default=(Cast("common_count", FloatField()) / F("skill_count")
+                     + F("common_count") * Value(SKILL_BONUS)),
+            output_field=FloatField(),
+        ))
+        .order_by("-score", "id")
+    )
+
+
+def explain(job, score, common_mask, missing_mask):
+    """
+    Template context for one rendered job: score, match_reason and the
+    common / missing Skill objects (taken from the job's prefetched skills).
+    """
+    if not common_mask and not missing_mask:
+        return {
+            "score": score,
+            "match_reason": "Job has no specific skills listed",
+            "common_skills": [],
+            "missing_skills": [],
+        }
+
+    skills_by_id = {skill.id: skill for skill in job.skills.all()}
+    common_skills = [skills_by_id[i] for i in skill_bits.skill_ids(common_mask) if i in skills_by_id]
+    missing_skills = [skills_by_id[i] for i in skill_bits.skill_ids(missing_mask) if i in skills_by_id]
+    job_skill_count = skill_bits.popcount(common_mask | missing_mask)
+    match_percentage = len(common_skills) / job_skill_count
+
+    common_names = ", ".join(s.name for s in common_skills)
+    if match_percentage == 1.0:
+        match_reason = f"Perfect match! You have all required skills: {common_names}"
+    elif match_percentage >= 0.5:
+        match_reason = f"Good match! You have {len(common_skills)}/{job_skill_count} skills: {common_names}"
+    else:
+        match_reason = f"Partial match. You have {len(common_skills)}/{job_skill_count} skills: {common_names}"
+
+    return {
+        "score": score,
+        "match_reason": match_reason,
+        "common_skills": common_skills,
+        "missing_skills": missing_skills,
+    }
+
+
+def _after_best(queryset, key):
+    score, job_id = key
+    return queryset.filter(Q(score__lt=score) | Q(score=score, job_id__gt=job_id))
+
+
+def best_match_page(recommended, cursor, page_size, refine=None):
+    """
+    One page of RecommendedJob rows, best score first, keyset-paginated on
+    (score, job id) so "load more" continues the stored ranking instead of
+    recomputing it. Only the top page_size rows (plus whatever refine drops)
+    are read; the row index serves the scan. Returns (rows, next_cursor).
+    """
+    cursor_key = None
+    if cursor:
+        try:
+            cursor_key = (float(cursor[0]), int(cursor[1]))
+        except (IndexError, TypeError, ValueError):
+            cursor_key = None
+    return pagination.keyset_page(
+        recommended.select_related("job").order_by("-score", "job_id"), cursor_key, page_size, "match",
+        key=lambda row: (row.score, row.job_id), after=_after_best, refine=refine,
+    )
+
+
+def _recommendation(user_id, job_id, score, profile_mask, job_mask):
+    return RecommendedJob(
+        user_id=user_id,
+        job_id=job_id,
+        score=score,
+        common=skill_bits.pack(profile_mask & job_mask),
+        missing=skill_bits.pack(job_mask & ~profile_mask),
+    )
+
+
+def jobs_with_skills(skill_ids):
+    """
+    Ids of jobs whose rows can change when a seeker gains or loses skill_ids:
+    the jobs listing one of them, plus jobs listing no skills (which are only
+    recommended to seekers that have at least one skill).
+    """
+    listing = JobPost.skills.through.objects.filter(skill_id__in=skill_ids).values("jobpost_id")
+    return list(JobPost.objects.filter(Q(id__in=listing) | Q(skill_bits=b"")).values_list("id", flat=True))
+
+
+def refresh_for_profiles(profile_ids, job_ids=None):
+    """
+    Recompute the RecommendedJob rows of the given seekers, limited to
+    job_ids when given. Each seeker is scored with one scored_jobs query.
+    """
+    for user_id, bits in Profile.objects.filter(id__in=profile_ids).values_list("user_id", "skill_bits"):
+        stale = RecommendedJob.objects.filter(user_id=user_id)
+        if job_ids is not None:
+            stale = stale.filter(job_id__in=job_ids)
+        stale.delete()
+
+        profile_mask = skill_bits.unpack(bits)
+        if not profile_mask:
+            continue
+        jobs = scored_jobs(skill_bits.skill_ids(profile_mask))
+        if job_ids is not None:
+            jobs = jobs.filter(id__in=job_ids)
+        RecommendedJob.objects.bulk_create(
+            [_recommendation(user_id, job_id, score, profile_mask, skill_bits.unpack(job_bits))
+             for job_id, score, job_bits in jobs.values_list("id", "score", "skill_bits")],
+            batch_size=500,
+        )
+
+
+def refresh_for_jobs(job_ids):
+    """
+    Recompute the RecommendedJob rows of the given jobs for every seeker
+    sharing one of their skills (every seeker with skills, for a job that
+    lists none). Unapproved or deleted jobs just lose their rows.
+    """
+    RecommendedJob.objects.filter(job_id__in=job_ids).delete()
+    rows = []
+    for job_id, bits in JobPost.objects.filter(id__in=job_ids, approved=True).values_list("id", "skill_bits"):
+        job_mask = skill_bits.unpack(bits)
+        profiles = Profile.objects.exclude(skill_bits=b"")
+        if job_mask:
+            sharing = Profile.skills.through.objects.filter(skill_id__in=skill_bits.skill_ids(job_mask))
+            profiles = profiles.filter(id__in=sharing.values("profile_id"))
+        job_skill_count = skill_bits.popcount(job_mask)
+        for user_id, profile_bits in profiles.values_list("user_id", "skill_bits"):
+            profile_mask = skill_bits.unpack(profile_bits)
+            score = match_score(skill_bits.popcount(profile_mask & job_mask), job_skill_count)
+            rows.append(_recommendation(user_id, job_id, score, profile_mask, job_mask))
+    RecommendedJob.objects.bulk_create(rows, batch_size=500)
+
@@ -0,0 +1,109 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .keywords import fts_phrase, query_tokens
+from .models import JobPost, Skill
+
+FTS_TABLE = "home_jobpost_fts"
+
+# bm25() column weights, in table column order: title, description, location, skills
+BM25_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+
+
+def is_available():
+    """The FTS5 table only exists on SQLite (see migration 0009)"""
+    return connection.vendor == "sqlite"
+
+
+def _terms(text):
+    """Each word as a quoted FTS5 (prefix) term, tokenized like the index (see home.keywords)"""
+    return " ".join(fts_phrase([word]) for word in query_tokens(text))
+
+
+def match_expression(keywords=None, title=None, location=None):
+    """
+    Build an FTS5 MATCH expression for the search form fields.
+
+    keywords are matched against every column, title and location only
+    against their own column. Returns None when nothing searchable was given.
+    """
+    clauses = []
+    if keywords and _terms(keywords):
+        clauses.append(f"({_terms(keywords)})")
+    if title and _terms(title):
+        clauses.append(f"{{title}} : ({_terms(title)})")
+    if location and _terms(location):
+        clauses.append(f"{{location}} : ({_terms(location)})")
+    return " AND ".join(clauses) or None
+
+
+def match_subquery(expression):
+    """Subquery of matching job ids, for use as id__in=..."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (expression,))
+
+
+def ranked_jobs(expression):
+    """(job id, bm25 score) pairs matching the expression, best (lowest) score first"""
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY score",
+            [expression],
+        )
+        return cursor.fetchall()
+
+
+def _document_select(where=""):
+    job_table = JobPost._meta.db_table
+    through_table = JobPost.skills.through._meta.db_table
+    skill_table = Skill._meta.db_table
+    return (
+        f"SELECT j.id, j.title, j.description, j.location, "
+        f"COALESCE((SELECT group_concat(s.name, ' ') FROM {through_table} js "
+        f"JOIN {skill_table} s ON s.id = js.skill_id WHERE js.jobpost_id = j.id), '') "
+        f"FROM {job_table} j {where}"
+    )
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def index_jobs(job_ids):
+    """(Re)index the given jobs; ids that no longer exist are just removed"""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(job_ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, location, skills) "
+                + _document_select(f"WHERE j.id IN ({placeholders})"),
+                chunk,
+            )
+
+
+def remove_jobs(job_ids):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(job_ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index():
+    """Repopulate the whole index from JobPost in one statement. Returns the row count."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, description, location, skills) "
+            + _document_select()
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import math
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import EARTH_RADIUS_KM, MILES_PER_KM
+
+CATALOG_VERSION_KEY = "home:catalog_version"
+PROFILE_VERSION_KEY = "home:profile_version"
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def catalog_version():
+    """
+    Token that changes whenever a job or its skills change. Cache keys built
+    on it go stale together; a random token (rather than a counter) means an
+    evicted version can never bring old entries back.
+    """
+    return _version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def profile_version():
+    """Like catalog_version, for profile visibility and skills"""
+    return _version(PROFILE_VERSION_KEY)
+
+
+def bump_profile_version():
+    cache.set(PROFILE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _clean(value):
+    return " ".join(value.lower().split()) if value else ""
+
+
+def filter_signature(params):
+    """Canonical form of the search filters, so equivalent queries share a key"""
+    origin = params["origin"]
+    canonical = {
+        "skills": sorted({str(skill_id) for skill_id in params["selected_skills"]}),
+        "q": _clean(params["keywords"]),
+        "title": _clean(params["title"]),
+        "location": _clean(params["location"]),
+        "min_salary": (params["min_salary"] or "").strip(),
+        "max_salary": (params["max_salary"] or "").strip(),
+        "remote": params["remote"] or "",
+        "visa": params["visa"] or "",
+        "origin": [round(origin[0], 4), round(origin[1], 4)] if origin else None,
+        "max_distance": params["max_distance_miles"],
+    }
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+
+
+def make_key(prefix, params):
+    digest = hashlib.sha1(filter_signature(params).encode()).hexdigest()
+    return f"home:{prefix}:{catalog_version()}:{digest}"
+
+
+def quantize_params(params):
+    """
+    Copy of the search params for sharing a cache entry between nearby
+    searches: the origin snapped to the centre of its SEARCH_CACHE_GEO_GRID
+    cell (in degrees), and the radius widened by half the cell's diagonal,
+    so the jobs found cover the radius of every origin in the cell. The
+    caller must repeat the radius check from the exact origin. A falsy grid
+    disables snapping.
+    """
+    grid = getattr(settings, "SEARCH_CACHE_GEO_GRID", 0.01)
+    origin = params["origin"]
+    if not origin or not grid:
+        return params
+    snapped = tuple(round((math.floor(value / grid) + 0.5) * grid, 6) for value in origin)
+    max_distance_miles = params["max_distance_miles"]
+    if max_distance_miles is not None:
+        # A degree of longitude is never longer than one of latitude; the
+        # extra 0.01 covers distances being rounded before the check
+        half_diagonal_km = math.radians(grid) * EARTH_RADIUS_KM * math.sqrt(2) / 2
+        max_distance_miles += half_diagonal_km * MILES_PER_KM + 0.01
+    return {**params, "origin": snapped, "max_distance_miles": max_distance_miles}
+
+
+def cached_results(prefix, params, compute):
+    """
+    Search results (e.g. ordered sort keys) from the cache or from
+    compute(). Entries expire after SEARCH_RESULT_CACHE_TTL seconds and are
+    dropped as soon as the catalog version changes.
+    """
+    key = make_key(prefix, params)
+    results = cache.get(key)
+    if results is None:
+        results = compute()
+        cache.set(key, results, getattr(settings, "SEARCH_RESULT_CACHE_TTL", 300))
+    return results
@@ -0,0 +1,140 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from . import profile_search, recommendations, search, search_cache, skill_bits, task_queue
+from .models import JobPost, Profile, RecommendedJob, Skill
+
+
+def _affected_owner_ids(instance, action, reverse, pk_set, accessor):
+    """
+    Ids of the jobs/profiles whose skills an m2m_changed signal touched, or
+    None when there is nothing to do yet. On the reverse side (skill.jobs.add()
+    and friends) instance is the Skill, so a clear has to remember the owners
+    in pre_clear, before the rows are gone.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            return [instance.id]
+        return None
+    stash = f"_cleared_{accessor}_ids"
+    if action == "pre_clear":
+        setattr(instance, stash, list(getattr(instance, accessor).values_list("id", flat=True)))
+    elif action == "post_clear":
+        return getattr(instance, stash, [])
+    elif action in ("post_add", "post_remove"):
+        return list(pk_set or [])
+    return None
+
+
+def _refresh_skill_bits(model, instance, reverse, owner_ids):
+    masks = skill_bits.refresh(model, owner_ids)
+    if not reverse:
+        # Keep the in-memory instance current so a later save() doesn't undo it
+        instance.skill_bits = skill_bits.pack(masks.get(instance.id, 0))
+
+
+def _recommendation_inputs(approved, bits):
+    return approved, bytes(bits or b"")
+
+
+@receiver(pre_save, sender=JobPost)
+def remember_recommendation_inputs(sender, instance, **kwargs):
+    """The stored approval and skills, to tell after the save whether they changed"""
+    stored = JobPost.objects.filter(id=instance.id).values_list("approved", "skill_bits").first() \
+        if instance.id else None
+    instance._stored_recommendation_inputs = _recommendation_inputs(*stored) if stored else None
+
+
+@receiver(post_save, sender=JobPost)
+def index_job_on_save(sender, instance, created, **kwargs):
+    """Keep the full-text index in step with the job's own fields"""
+    search.index_jobs([instance.id])
+    # Recommendations only depend on approval and skills, so edits such as a
+    # new salary leave them alone. The worker recomputes them after the commit;
+    # new jobs get their rows again once skills are added.
+    stored = getattr(instance, "_stored_recommendation_inputs", None)
+    if created or stored != _recommendation_inputs(instance.approved, instance.skill_bits):
+        task_queue.enqueue(
+            "home.refresh_job_recommendations",
+            {"job_id": instance.id},
+            key=f"refresh_job_recommendations:{instance.id}",
+        )
+    search_cache.bump_catalog_version()
+
+
+@receiver(post_delete, sender=JobPost)
+def remove_job_from_index(sender, instance, **kwargs):
+    search.remove_jobs([instance.id])
+    search_cache.bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=JobPost.skills.through)
+def reindex_jobs_on_skill_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Skill names are part of the indexed document, so reindex on m2m changes"""
+    job_ids = _affected_owner_ids(instance, action, reverse, pk_set, "jobs")
+    if job_ids is None:
+        return
+    search.index_jobs(job_ids)
+    _refresh_skill_bits(JobPost, instance, reverse, job_ids)
+    recommendations.refresh_for_jobs(job_ids)
+    search_cache.bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+def refresh_profile_skill_bits(sender, instance, action, reverse, pk_set, **kwargs):
+    profile_ids = _affected_owner_ids(instance, action, reverse, pk_set, "profile_set")
+    if profile_ids is None:
+        return
+    _refresh_skill_bits(Profile, instance, reverse, profile_ids)
+
+    # Only jobs listing a changed skill (or none at all) can score differently
+    if reverse:
+        job_ids = recommendations.jobs_with_skills([instance.id])
+    elif action == "post_clear":
+        job_ids = None
+    else:
+        job_ids = recommendations.jobs_with_skills(pk_set)
+    recommendations.refresh_for_profiles(profile_ids, job_ids)
+    search_cache.bump_profile_version()
+
+
+@receiver(post_save, sender=Profile)
+def index_profile_on_save(sender, instance, **kwargs):
+    """Text and privacy flags feed the keyword index, visibility the candidate index"""
+    profile_search.index_profiles([instance.id])
+    search_cache.bump_profile_version()
+
+
+@receiver(post_delete, sender=Profile)
+def drop_recommendations_of_deleted_profile(sender, instance, **kwargs):
+    RecommendedJob.objects.filter(user_id=instance.user_id).delete()
+    profile_search.remove_profiles([instance.id])
+    search_cache.bump_profile_version()
+
+
+@receiver(post_save, sender=Skill)
+def reindex_jobs_on_skill_rename(sender, instance, created, **kwargs):
+    if not created:
+        search.index_jobs(instance.jobs.values_list("id", flat=True))
+        search_cache.bump_catalog_version()
+
+
+@receiver(pre_delete, sender=Skill)
+def remember_owners_of_deleted_skill(sender, instance, **kwargs):
+    instance._deleted_job_ids = list(instance.jobs.values_list("id", flat=True))
+    instance._deleted_profile_ids = list(instance.profile_set.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Skill)
+def reindex_owners_of_deleted_skill(sender, instance, **kwargs):
+    """The cascade removes the m2m rows without sending m2m_changed"""
+    job_ids = getattr(instance, "_deleted_job_ids", [])
+    profile_ids = getattr(instance, "_deleted_profile_ids", [])
+    search.index_jobs(job_ids)
+    skill_bits.refresh(JobPost, job_ids)
+    skill_bits.refresh(Profile, profile_ids)
+    recommendations.refresh_for_jobs(job_ids)
+    # Seekers left without skills lose their rows for skill-less jobs
+    recommendations.refresh_for_profiles(profile_ids, recommendations.jobs_with_skills([]))
+    search_cache.bump_catalog_version()
+    search_cache.bump_profile_version()
@@ -0,0 +1,72 @@
+"""
+Skill sets as integer bitmasks: bit n is set when the owner has the skill
+whose id is n. JobPost.skill_bits and Profile.skill_bits store the mask as
+packed little-endian bytes and are kept in sync by home.signals.
+"""
+
+
+def to_mask(skill_ids):
+    mask = 0
+    for skill_id in skill_ids:
+        mask |= 1 << skill_id
+    return mask
+
+
+def skill_ids(mask):
+    """Skill ids set in mask, ascending"""
+    ids = []
+    position = 0
+    while mask:
+        if mask & 1:
+            ids.append(position)
+        mask >>= 1
+        position += 1
+    return ids
+
+
+def pack(mask):
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+
+def unpack(data):
+    return int.from_bytes(data or b"", "little")
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def coverage(have, wanted):
+    """Share of the wanted skills that are present in have (0.0 when none are wanted)"""
+    total = popcount(wanted)
+    return popcount(have & wanted) / total if total else 0.0
+
+
+def jaccard(a, b):
+    union = popcount(a | b)
+    return popcount(a & b) / union if union else 0.0
+
+
+def refresh(model, owner_ids):
+    """
+    Recompute skill_bits for the given JobPost or Profile ids from the m2m
+    table, with one read and a bulk update per chunk. Returns {id: mask}.
+    """
+    field = model._meta.get_field("skills")
+    through = field.remote_field.through
+    owner = f"{field.m2m_field_name()}_id"
+
+    masks = {}
+    owner_ids = sorted(set(owner_ids))
+    for start in range(0, len(owner_ids), 500):
+        chunk = owner_ids[start:start + 500]
+        chunk_masks = dict.fromkeys(chunk, 0)
+        rows = through.objects.filter(**{f"{owner}__in": chunk}).values_list(owner, "skill_id")
+        for owner_id, skill_id in rows:
+            chunk_masks[owner_id] |= 1 << skill_id
+        model.objects.bulk_update(
+            [model(id=owner_id, skill_bits=pack(mask)) for owner_id, mask in chunk_masks.items()],
+            ["skill_bits"],
+        )
+        masks.update(chunk_masks)
+    return masks
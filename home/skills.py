@@ -0,0 +1,30 @@
+from django.db.models import Count
+
+
+def with_all_skills(queryset, skill_ids):
+    """
+    Restrict a JobPost or Profile queryset to rows that have every skill in
+    skill_ids.
+
+    Expressed as a single subquery over the m2m table,
+    ``GROUP BY owner HAVING COUNT(*) = k``, instead of one self-join per skill.
+    """
+    try:
+        skill_ids = {int(skill_id) for skill_id in skill_ids}
+    except (TypeError, ValueError):
+        return queryset.none()
+    if not skill_ids:
+        return queryset
+
+    field = queryset.model._meta.get_field("skills")
+    through = field.remote_field.through
+    owner = f"{field.m2m_field_name()}_id"
+    owners_with_all = (
+        through.objects
+        .filter(skill_id__in=skill_ids)
+        .values(owner)
+        .annotate(matched=Count("skill_id"))
+        .filter(matched=len(skill_ids))
+        .values(owner)
+    )
+    return queryset.filter(id__in=owners_with_all)
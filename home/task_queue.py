@@ -0,0 +1,141 @@
+"""
+Database-backed background tasks, so request handlers (and the signals
+they fire) can hand work off without an external broker.
+
+Task functions are registered with @task("name") in an app's tasks.py
+module and receive the task's JSON payload as keyword arguments. They
+should be safe to run more than once: a task whose worker dies is picked
+up again once its lease expires. Finished tasks are kept for
+TASK_RETENTION_DAYS and then deleted by the worker (see prune).
+"""
+import datetime
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as the handler for tasks called name"""
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def autodiscover():
+    """Import every installed app's tasks module so its handlers are registered"""
+    autodiscover_modules("tasks")
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=3):
+    """
+    Store a task for the worker. When key is given and a task with that key
+    is still pending, nothing new is stored and that task is returned.
+    Enqueued inside a transaction, the task only becomes visible on commit.
+    """
+    run_after = timezone.now() + datetime.timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                payload=payload or {},
+                idempotency_key=key,
+                max_attempts=max_attempts,
+                run_after=run_after,
+            )
+    except IntegrityError:
+        if key is None:
+            raise
+        return Task.objects.filter(idempotency_key=key, status=Task.PENDING).first()
+
+
+def _lease():
+    return datetime.timedelta(seconds=getattr(settings, "TASK_LEASE_SECONDS", 300))
+
+
+def claim(worker, limit=1):
+    """
+    Claim up to limit due tasks for worker, oldest first. Running tasks whose
+    lease expired (their worker died) are claimed again. Each claim is a
+    conditional UPDATE, so concurrent workers never get the same task.
+    """
+    now = timezone.now()
+    due = Q(status=Task.PENDING, run_after__lte=now) | Q(status=Task.RUNNING, locked_at__lt=now - _lease())
+    claimed = []
+    for task_id, status in Task.objects.filter(due).order_by("run_after", "id").values_list("id", "status")[:limit * 2]:
+        updated = Task.objects.filter(id=task_id, status=status).filter(due).update(
+            status=Task.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+        if updated:
+            claimed.append(task_id)
+            if len(claimed) == limit:
+                break
+    return list(Task.objects.filter(id__in=claimed, locked_by=worker).order_by("run_after", "id"))
+
+
+def _retry_delay(attempts):
+    return datetime.timedelta(seconds=getattr(settings, "TASK_RETRY_DELAY", 30) * 2 ** (attempts - 1))
+
+
+def run(task_obj):
+    """
+    Execute one claimed task and record the outcome. A failed attempt is
+    rolled back and retried with exponential backoff until max_attempts.
+    Returns True on success.
+    """
+    mine = Task.objects.filter(id=task_obj.id, status=Task.RUNNING, locked_by=task_obj.locked_by)
+    try:
+        handler = _registry[task_obj.name]
+    except KeyError:
+        mine.update(status=Task.FAILED, last_error=f"No task registered as {task_obj.name!r}",
+                    updated_at=timezone.now())
+        return False
+
+    try:
+        # The handler's writes and the DONE mark commit together
+        with transaction.atomic():
+            handler(**task_obj.payload)
+            mine.update(status=Task.DONE, last_error="", updated_at=timezone.now())
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if task_obj.attempts >= task_obj.max_attempts:
+            mine.update(status=Task.FAILED, last_error=error, updated_at=now)
+            return False
+        try:
+            with transaction.atomic():
+                mine.update(status=Task.PENDING, run_after=now + _retry_delay(task_obj.attempts),
+                            last_error=error, updated_at=now)
+        except IntegrityError:
+            # A newer task with the same key is already pending and will redo the work
+            mine.update(status=Task.DONE, last_error=error, updated_at=now)
+        return False
+    return True
+
+
+def prune(older_than):
+    """
+    Delete done and failed tasks last updated more than older_than (a
+    timedelta) ago, in batches so no single delete holds the table long.
+    Returns the number deleted.
+    """
+    cutoff = timezone.now() - older_than
+    finished = Task.objects.filter(status__in=[Task.DONE, Task.FAILED], updated_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(finished.order_by().values_list("id", flat=True)[:1000])
+        if not ids:
+            return deleted
+        deleted += Task.objects.filter(id__in=ids).delete()[0]
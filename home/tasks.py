@@ -0,0 +1,8 @@
+from .task_queue import task
+from . import recommendations
+
+
+@task("home.refresh_job_recommendations")
+def refresh_job_recommendations(job_id):
+    """Recompute a saved job's RecommendedJob rows (see home.signals)"""
+    recommendations.refresh_for_jobs([job_id])
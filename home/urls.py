@@ -5,6 +5,7 @@ app_name = "home"
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("jobs/clusters/", views.job_clusters, name="job_clusters"),
     path("apply/<int:job_id>/", views.apply_job, name="apply_job"),
     path("profile/", views.profile_view, name="profile"),
     path("my-applications/", views.my_applications, name="my_applications"),
@@ -1,143 +1,329 @@
-from math import radians, sin, cos, sqrt, atan2
+from django.db.models import prefetch_related_objects
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 
 from accounts.forms import ProfileForm
-from .models import JobPost, Skill, Application, Profile
+from . import facets, pagination, recommendations, search, search_cache
+from .geo import (
+    MILES_PER_KM, batch_distances, cell_size_for_zoom, grid_clusters, parse_bbox,
+    prefilter_by_radius, viewport_q, within_distance,
+)
+from .models import JobPost, Skill, Application, Profile, RecommendedJob
+from .skills import with_all_skills
 from django.contrib.auth.decorators import login_required
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-def index(request):
-    jobs = JobPost.objects.all()
-    all_skills = Skill.objects.all()
-
-    selected_skills = request.GET.getlist("skills")
-    title = request.GET.get("title")
-    location = request.GET.get("location")
-    min_salary = request.GET.get("min_salary")
-    max_salary = request.GET.get("max_salary")
-    remote = request.GET.get("remote")
-    visa = request.GET.get("visa")
-    distance_filter = request.GET.get("distance")
+def _search_params(request):
+    """Read the job search form from the query string (shared by index and job_clusters)"""
+    params = {
+        "selected_skills": request.GET.getlist("skills"),
+        "keywords": request.GET.get("q"),
+        "title": request.GET.get("title"),
+        "location": request.GET.get("location"),
+        "min_salary": request.GET.get("min_salary"),
+        "max_salary": request.GET.get("max_salary"),
+        "remote": request.GET.get("remote"),
+        "visa": request.GET.get("visa"),
+        "distance": request.GET.get("distance"),
+        "origin": None,
+        "max_distance_miles": None,
+        "user_commute_radius": None,
+    }
     user_lat = request.GET.get("lat")
     user_lon = request.GET.get("lon")
-    view_mode = request.GET.get("view", "list")
-    
+
     # Get user's commute radius and location if logged in
-    user_commute_radius = None
     profile_lat = None
     profile_lon = None
     if request.user.is_authenticated:
         try:
             profile = Profile.objects.get(user=request.user)
-            user_commute_radius = profile.commute_radius_miles
+            params["user_commute_radius"] = profile.commute_radius_miles
             profile_lat = profile.latitude
             profile_lon = profile.longitude
         except Profile.DoesNotExist:
             pass
 
-    if title:
-        jobs = jobs.filter(title__icontains=title)
-    if selected_skills:
-        for skill_id in selected_skills:
-            jobs = jobs.filter(skills__id=skill_id)
-    if location:
-        jobs = jobs.filter(location__icontains=location)
-    if min_salary:
-        jobs = jobs.filter(min_salary__gte=min_salary)
-    if max_salary:
-        jobs = jobs.filter(max_salary__lte=max_salary)
-    if remote:
-        jobs = jobs.filter(remote=(remote == "remote"))
-    if visa:
-        jobs = jobs.filter(visa_sponsorship=(visa == "yes"))
-
-    job_list = []
+    # Use manual location if provided, otherwise use profile location
+    effective_lat = None
+    effective_lon = None
     try:
-        # Use manual location if provided, otherwise use profile location
-        effective_lat = None
-        effective_lon = None
-        
         if user_lat and user_lon:
             effective_lat = float(user_lat)
             effective_lon = float(user_lon)
         elif profile_lat and profile_lon:
             effective_lat = profile_lat
             effective_lon = profile_lon
-            
-        if effective_lat and effective_lon:
-            for job in jobs:
-                if job.latitude and job.longitude:
-                    dist = haversine(effective_lat, effective_lon, job.latitude, job.longitude)
-                    job.distance_km = round(dist, 2)
-                    job.distance_miles = round(dist * 0.621371, 2)  # Convert km to miles
-                else:
-                    job.distance_km = None
-                    job.distance_miles = None
-                job_list.append(job)
-            
-            # Apply distance filtering (optional)
-            max_distance_miles = None
-            distance_filtering_active = False
-            
-            # Check if user explicitly set a distance filter
-            if distance_filter and distance_filter.strip():
-                try:
-                    max_distance_miles = float(distance_filter)
-                    distance_filtering_active = True
-                except ValueError:
-                    # If distance_filter is not a valid number, ignore it
-                    pass
-            
-            # If no manual distance filter, check user's profile commute radius
-            elif user_commute_radius is not None and user_commute_radius > 0:
-                max_distance_miles = user_commute_radius
-                distance_filtering_active = True
-            
-            # Apply distance filtering only if explicitly requested
-            if distance_filtering_active and max_distance_miles is not None:
-                # Filter jobs by distance (compare in miles), but always include remote jobs
-                job_list = [job for job in job_list if 
-                           (job.distance_miles and job.distance_miles <= max_distance_miles) or 
-                           job.remote]
-        else:
-            for job in jobs:
-                job.distance_km = None
-                job.distance_miles = None
-                job_list.append(job)
     except ValueError:
-        for job in jobs:
+        effective_lat = effective_lon = None
+    if not (effective_lat and effective_lon):
+        return params
+    params["origin"] = (effective_lat, effective_lon)
+
+    # Check if user explicitly set a distance filter
+    distance_filter = params["distance"]
+    if distance_filter and distance_filter.strip():
+        try:
+            params["max_distance_miles"] = float(distance_filter)
+        except ValueError:
+            # If distance_filter is not a valid number, ignore it
+            pass
+    # If no manual distance filter, check user's profile commute radius
+    elif params["user_commute_radius"] is not None and params["user_commute_radius"] > 0:
+        params["max_distance_miles"] = params["user_commute_radius"]
+    return params
+
+
+def _filtered_jobs(params):
+    """
+    Apply the search filters in SQL. Returns (jobs, match) where match is
+    the FTS5 expression used for the text fields, or None.
+    """
+    jobs = JobPost.objects.all()
+
+    # Text filters go through the FTS5 index when it is available
+    match = None
+    if search.is_available():
+        match = search.match_expression(
+            keywords=params["keywords"], title=params["title"], location=params["location"]
+        )
+    if match:
+        jobs = jobs.filter(id__in=search.match_subquery(match))
+    else:
+        if params["title"]:
+            jobs = jobs.filter(title__icontains=params["title"])
+        if params["location"]:
+            jobs = jobs.filter(location__icontains=params["location"])
+    if params["selected_skills"]:
+        jobs = with_all_skills(jobs, params["selected_skills"])
+    if params["min_salary"]:
+        jobs = jobs.filter(min_salary__gte=params["min_salary"])
+    if params["max_salary"]:
+        jobs = jobs.filter(max_salary__lte=params["max_salary"])
+    if params["remote"]:
+        jobs = jobs.filter(remote=(params["remote"] == "remote"))
+    if params["visa"]:
+        jobs = jobs.filter(visa_sponsorship=(params["visa"] == "yes"))
+
+    # Narrow to the radius' bounding box in SQL before the exact check
+    if params["max_distance_miles"] is not None:
+        lat, lon = params["origin"]
+        jobs = prefilter_by_radius(jobs, lat, lon, params["max_distance_miles"])
+    return jobs, match
+
+
+def _attach_distances(job_list, origin):
+    """Set distance_km/distance_miles on each job (None without an origin or coordinates)"""
+    distances = {}
+    if origin and job_list:
+        distances = dict(batch_distances(
+            origin[0], origin[1],
+            [job.id for job in job_list],
+            [job.latitude for job in job_list],
+            [job.longitude for job in job_list],
+        ))
+    for job in job_list:
+        dist = distances.get(job.id)
+        if dist is not None:
+            job.distance_km = round(dist, 2)
+            job.distance_miles = round(dist * MILES_PER_KM, 2)  # Convert km to miles
+        else:
             job.distance_km = None
             job.distance_miles = None
-            job_list.append(job)
+    return job_list
+
+
+def _candidate_rows(jobs, match, sort):
+    """
+    (id, latitude, longitude, remote, created_at, score) for every job that
+    passes the SQL filters. Only these columns are read; the score is the
+    text relevance, and 0 unless sorting by it.
+    """
+    rows = jobs.values_list("id", "latitude", "longitude", "remote", "created_at")
+    scores = dict(search.ranked_jobs(match)) if sort == "relevance" else {}
+    return [(*row, scores.get(row[0], 0.0)) for row in rows]
+
+
+def _ordered_keys(rows, sort, params):
+    """
+    Sort keys, each ending in the job id, for the candidate rows in page
+    order. The exact radius check runs here so pages never come out short.
+    """
+    origin = params["origin"]
+    distances = {}
+    if origin:
+        distances = dict(batch_distances(
+            origin[0], origin[1],
+            [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows],
+        ))
+    if params["max_distance_miles"] is not None:
+        rows = [row for row in rows
+                if within_distance(distances.get(row[0]), row[3], params["max_distance_miles"])]
+
+    if sort == "relevance":
+        keys = [(row[5], row[0]) for row in rows]
+    elif sort == "distance":
+        # Jobs without coordinates (remote) go after every located job
+        keys = [(0, distances[row[0]], row[0]) if row[0] in distances else (1, 0.0, row[0])
+                for row in rows]
+    else:
+        # Newest first, as ascending keys
+        keys = [(-row[4].timestamp(), -row[0], row[0]) for row in rows]
+    keys.sort()
+    return keys
+
+
+def _hydrate_page(page_keys, origin):
+    """Load just the page's jobs, in key order, with distances from the exact origin"""
+    jobs_by_id = JobPost.objects.in_bulk([key[-1] for key in page_keys])
+    job_list = [jobs_by_id[key[-1]] for key in page_keys if key[-1] in jobs_by_id]
+    return _attach_distances(job_list, origin)
+
+
+def index(request):
+    all_skills = Skill.objects.all()
+    params = _search_params(request)
+    view_mode = request.GET.get("view", "list")
+    origin = params["origin"]
+    distance_filtering_active = params["max_distance_miles"] is not None
+
+    jobs, match = _filtered_jobs(params)
+
+    # Relevance when searching text, otherwise newest first; distance on request
+    sort = request.GET.get("sort") or ("relevance" if match else "newest")
+    if (sort == "relevance" and not match) or (sort == "distance" and not origin) \
+            or sort not in ("newest", "relevance", "distance"):
+        sort = "newest"
+
+    job_list = []
+    next_query = None
+    # The map view loads its clusters per viewport from job_clusters
+    if view_mode != "map":
+        page_size = pagination.page_size_from(request)
+        cursor = pagination.decode_cursor(request.GET.get("cursor"), sort)
+        if origin:
+            # Nearby searches share the candidates found around their grid
+            # cell; the radius check and distances use the exact origin
+            cell_params = search_cache.quantize_params(params)
+            rows = search_cache.cached_results(
+                f"candidates:{sort}", cell_params, lambda: _candidate_rows(*_filtered_jobs(cell_params), sort)
+            )
+            keys = _ordered_keys(rows, sort, params)
+        else:
+            keys = search_cache.cached_results(
+                f"results:{sort}", params, lambda: _ordered_keys(_candidate_rows(jobs, match, sort), sort, params)
+            )
+        page_keys, next_cursor = pagination.seek(keys, cursor, page_size, sort)
+        job_list = _hydrate_page(page_keys, origin)
+        # One query for every card's skill badges
+        prefetch_related_objects(job_list, "skills")
+        if next_cursor:
+            query = request.GET.copy()
+            query["cursor"] = next_cursor
+            next_query = query.urlencode()
+
+    first_query = request.GET.copy()
+    first_query.pop("cursor", None)
+
+    # Remote, visa and salary are counted as if their own filter were unset
+    unfaceted_jobs, _ = _filtered_jobs({**params, "remote": None, "visa": None, "min_salary": None})
+    facet_counts = facets.facet_counts(params, unfaceted_jobs)
+    salary_facets = []
+    for threshold in facets.SALARY_THRESHOLDS:
+        query = first_query.copy()
+        query["min_salary"] = threshold
+        salary_facets.append({
+            "label": f"${threshold // 1000}k+",
+            "count": facet_counts["salary"][threshold],
+            "query": query.urlencode(),
+        })
 
-    # Use effective coordinates for template context
-    template_lat = effective_lat if 'effective_lat' in locals() else (float(user_lat) if user_lat else None)
-    template_lon = effective_lon if 'effective_lon' in locals() else (float(user_lon) if user_lon else None)
-    
-    # Determine if distance filtering is active for template context
-    active_distance_filter = None
-    if 'distance_filtering_active' in locals() and distance_filtering_active:
-        active_distance_filter = max_distance_miles
-    
     return render(request, "home/index.html", {
         "jobs": job_list,
         "all_skills": all_skills,
-        "selected_skills": selected_skills,
-        "distance": distance_filter,
+        "selected_skills": params["selected_skills"],
+        "distance": params["distance"],
         "view_mode": view_mode,
-        "user_lat": template_lat,
-        "user_lon": template_lon,
-        "user_commute_radius": user_commute_radius,
-        "active_distance_filter": active_distance_filter,
-        "distance_filtering_active": locals().get('distance_filtering_active', False),
+        "sort": sort,
+        "user_lat": origin[0] if origin else None,
+        "user_lon": origin[1] if origin else None,
+        "user_commute_radius": params["user_commute_radius"],
+        "active_distance_filter": params["max_distance_miles"],
+        "distance_filtering_active": distance_filtering_active,
+        "facets": facet_counts,
+        "salary_facets": salary_facets,
+        "next_query": next_query,
+        "first_query": first_query.urlencode(),
+        "is_first_page": "cursor" not in request.GET,
+    })
+
+
+MARKER_FIELDS = (
+    "id", "title", "location", "latitude", "longitude", "min_salary", "max_salary",
+    "remote", "visa_sponsorship", "created_at",
+)
+
+
+def _marker_json(job):
+    return {
+        "id": job.id,
+        "title": job.title,
+        "location": job.location,
+        "lat": job.latitude,
+        "lon": job.longitude,
+        "min_salary": str(job.min_salary) if job.min_salary is not None else None,
+        "max_salary": str(job.max_salary) if job.max_salary is not None else None,
+        "remote": job.remote,
+        "visa_sponsorship": job.visa_sponsorship,
+        "distance_km": job.distance_km,
+    }
+
+
+def _located_jobs_in_view(request, params):
+    """Filtered jobs with coordinates, restricted to the ?bbox= viewport if given"""
+    jobs, _ = _filtered_jobs(params)
+    jobs = jobs.filter(latitude__isnull=False, longitude__isnull=False)
+    bbox = parse_bbox(request.GET.get("bbox"))
+    if bbox:
+        jobs = jobs.filter(viewport_q(*bbox))
+    return jobs
+
+
+def job_clusters(request):
+    """
+    Grid-clustered map markers for the requested viewport and ?zoom=, as JSON.
+    Cells holding a single job come back as full markers instead of clusters.
+    """
+    params = _search_params(request)
+    jobs = _located_jobs_in_view(request, params)
+    try:
+        zoom = min(max(int(request.GET.get("zoom", 4)), 0), 20)
+    except ValueError:
+        zoom = 4
+
+    rows = list(jobs.order_by("-created_at", "-id").values_list("id", "latitude", "longitude", "remote"))
+    if params["max_distance_miles"] is not None:
+        origin = params["origin"]
+        distances = dict(batch_distances(
+            origin[0], origin[1],
+            [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows],
+        ))
+        rows = [row for row in rows
+                if within_distance(distances.get(row[0]), row[3], params["max_distance_miles"])]
+
+    cell_size = cell_size_for_zoom(zoom)
+    cells = grid_clusters(
+        [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows], cell_size
+    )
+    single_ids = [cell["ids"][0] for cell in cells if cell["count"] == 1]
+    singles = list(JobPost.objects.filter(id__in=single_ids).only(*MARKER_FIELDS))
+    _attach_distances(singles, params["origin"])
+
+    return JsonResponse({
+        "zoom": zoom,
+        "cell_size": cell_size,
+        "clusters": [cell for cell in cells if cell["count"] > 1],
+        "markers": [_marker_json(job) for job in singles],
     })
 
 
@@ -192,121 +378,77 @@ def my_applications(request):
     })
 
 
+def _within_commute(profile, jobs):
+    """
+    Jobs inside the profile's commute radius (setting distance_miles), plus
+    remote jobs and jobs without coordinates, which are always kept
+    """
+    located = [job for job in jobs if not job.remote and job.latitude and job.longitude]
+    nearby = dict(batch_distances(
+        profile.latitude, profile.longitude,
+        [job.id for job in located],
+        [job.latitude for job in located],
+        [job.longitude for job in located],
+        max_km=profile.commute_radius_miles / MILES_PER_KM,
+    ))
+    kept = []
+    for job in jobs:
+        if job.remote or not (job.latitude and job.longitude):
+            kept.append(job)
+        elif job.id in nearby:
+            job.distance_miles = round(nearby[job.id] * MILES_PER_KM, 2)
+            kept.append(job)
+    return kept
+
+
 @login_required
 def job_recommendations(request):
     """Display job recommendations based on user's skills"""
-    try:
-        # Get user's profile and skills
-        profile = Profile.objects.get(user=request.user)
-        user_skills = set(profile.skills.all())
-        
-        if not user_skills:
-            # If user has no skills, show all jobs
-            recommended_jobs = JobPost.objects.filter(approved=True).order_by('-created_at')
-            job_context = {}
-        else:
-            # Get all approved jobs
-            all_jobs = JobPost.objects.filter(approved=True)
-            
-            # Calculate match scores for each job
-            job_scores = []
-            for job in all_jobs:
-                job_skills = set(job.skills.all())
-                
-                if not job_skills:
-                    # If job has no skills specified, give it a low score
-                    match_score = 0.1
-                    match_reason = "Job has no specific skills listed"
-                else:
-                    # Calculate skill match percentage
-                    common_skills = user_skills.intersection(job_skills)
-                    match_percentage = len(common_skills) / len(job_skills)
-                    
-                    # Bonus for having more matching skills
-                    skill_bonus = len(common_skills) * 0.1
-                    
-                    # Calculate final score
-                    match_score = match_percentage + skill_bonus
-                    
-                    if match_percentage == 1.0:
-                        match_reason = f"Perfect match! You have all required skills: {', '.join([s.name for s in common_skills])}"
-                    elif match_percentage >= 0.5:
-                        match_reason = f"Good match! You have {len(common_skills)}/{len(job_skills)} skills: {', '.join([s.name for s in common_skills])}"
-                    else:
-                        match_reason = f"Partial match. You have {len(common_skills)}/{len(job_skills)} skills: {', '.join([s.name for s in common_skills])}"
-                
-                # Add job with score and reason
-                job_scores.append({
-                    'job': job,
-                    'score': match_score,
-                    'match_reason': match_reason,
-                    'common_skills': list(common_skills) if 'common_skills' in locals() else [],
-                    'missing_skills': list(job_skills - user_skills) if 'job_skills' in locals() and job_skills else []
-                })
-            
-            # Sort by match score (highest first)
-            job_scores.sort(key=lambda x: x['score'], reverse=True)
-            
-            # Get the recommended jobs
-            recommended_jobs = [item['job'] for item in job_scores]
-            
-            # Pass additional context for the template
-            job_context = {item['job'].id: {
-                'score': item['score'],
-                'match_reason': item['match_reason'],
-                'common_skills': item['common_skills'],
-                'missing_skills': item['missing_skills']
-            } for item in job_scores}
-    
-    except Profile.DoesNotExist:
-        # If user has no profile, show all jobs
-        recommended_jobs = JobPost.objects.filter(approved=True).order_by('-created_at')
-        job_context = {}
-        user_skills = set()
-    
+    profile = Profile.objects.filter(user=request.user).first()
+    user_skills = set(profile.skills.all()) if profile else set()
+
     # Get user's applied job IDs to exclude them from recommendations
     applied_job_ids = Application.objects.filter(applicant=request.user).values_list('job_id', flat=True)
-    
-    # Filter out already applied jobs
-    recommended_jobs = [job for job in recommended_jobs if job.id not in applied_job_ids]
-    
+
     # Apply commute radius filtering if user has location and commute radius
-    try:
-        profile = Profile.objects.get(user=request.user)
-        user_commute_radius = profile.commute_radius_miles
-        
-        if user_commute_radius and user_commute_radius > 0:
-            # Get user's location from profile
-            user_lat = profile.latitude
-            user_lon = profile.longitude
-            
-            # Only apply distance filtering if user has set their location
-            if user_lat and user_lon:
-                # Calculate distances and filter
-                filtered_jobs = []
-                for job in recommended_jobs:
-                    if job.remote:
-                        # Always include remote jobs
-                        filtered_jobs.append(job)
-                    elif job.latitude and job.longitude:
-                        # Calculate distance for non-remote jobs
-                        distance_km = haversine(user_lat, user_lon, job.latitude, job.longitude)
-                        distance_miles = distance_km * 0.621371
-                        
-                        if distance_miles <= user_commute_radius:
-                            job.distance_miles = round(distance_miles, 2)
-                            filtered_jobs.append(job)
-                    else:
-                        # Include jobs without coordinates (fallback)
-                        filtered_jobs.append(job)
-                
-                recommended_jobs = filtered_jobs
-    except Profile.DoesNotExist:
-        pass
-    
+    commute = bool(profile and profile.commute_radius_miles and profile.latitude and profile.longitude)
+    page_size = pagination.page_size_from(request)
+
+    if user_skills:
+        # Stream the stored ranking page by page; only rendered jobs get explanations
+        def refine(batch):
+            kept = {job.id for job in _within_commute(profile, [rec.job for rec in batch])}
+            return [rec for rec in batch if rec.job_id in kept]
+
+        recommended = RecommendedJob.objects.filter(user=request.user).exclude(job_id__in=applied_job_ids)
+        cursor = pagination.decode_cursor(request.GET.get("cursor"), "match")
+        page, next_cursor = recommendations.best_match_page(
+            recommended, cursor, page_size, refine if commute else None)
+        recommended_jobs = [rec.job for rec in page]
+        prefetch_related_objects(recommended_jobs, 'skills')
+        for rec in page:
+            rec.job.match = recommendations.explain(rec.job, rec.score, rec.common_mask, rec.missing_mask)
+    else:
+        # If user has no skills (or no profile), show all jobs newest first
+        jobs = JobPost.objects.filter(approved=True).exclude(id__in=applied_job_ids)
+        cursor = pagination.decode_cursor(request.GET.get("cursor"), "newest")
+        recommended_jobs, next_cursor = pagination.newest_first_page(
+            jobs, cursor, page_size, (lambda batch: _within_commute(profile, batch)) if commute else None)
+        prefetch_related_objects(recommended_jobs, 'skills')
+
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query["cursor"] = next_cursor
+        next_query = query.urlencode()
+    first_query = request.GET.copy()
+    first_query.pop("cursor", None)
+
     return render(request, "home/job_recommendations.html", {
         "recommended_jobs": recommended_jobs,
-        "job_context": job_context,
         "user_skills": user_skills,
         "applied_job_ids": applied_job_ids,
+        "next_query": next_query,
+        "first_query": first_query.urlencode(),
+        "is_first_page": "cursor" not in request.GET,
     })
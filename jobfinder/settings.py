@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,6 +47,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.unread_badges',
             ],
         },
     },
@@ -108,6 +110,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "accounts.User"
 
+# Caches
+# Per-process memory by default. Point JOBFINDER_CACHE_DIR at a directory all
+# workers can reach to share search results and their invalidation.
+if os.environ.get("JOBFINDER_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["JOBFINDER_CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Job search
+JOB_LIST_PAGE_SIZE = 20
+JOB_LIST_MAX_PAGE_SIZE = 100
+SEARCH_RESULT_CACHE_TTL = 300
+FACETS_CACHE_TTL = 300  # seconds the facet counts of a filter set are cached
+SEARCH_CACHE_GEO_GRID = 0.01  # degrees (~1 km); searches from one grid cell share cached candidates
+
+# Candidate recommendations
+CANDIDATE_RECOMMENDATION_LIMIT = 500  # best matches kept per job before paging
+
+# Background tasks (python manage.py run_worker)
+TASK_LEASE_SECONDS = 300  # a running task is retried after this if its worker vanished
+TASK_RETRY_DELAY = 30  # seconds before the first retry; doubles per attempt
+TASK_RETENTION_DAYS = 7  # done and failed tasks are deleted by the worker after this
+
+# Saved-search notifications
+SAVED_SEARCH_INDEX_TTL = 300  # seconds the percolator index is cached; edits also rebuild it
+NOTIFICATION_DIGEST_INTERVAL = 900  # seconds matches are buffered before one digest per search
+
+# Real-time messages (see accounts.realtime)
+MESSAGE_HUB_BACKEND = "accounts.realtime.LocalHub"
+MESSAGE_EVENTS_KEEPALIVE = 15  # seconds between keepalive comments on an idle stream (or polls under WSGI)
+MESSAGE_EVENTS_MAX_SECONDS = 300  # a stream ends after this long; the browser reconnects
+BADGE_CACHE_TTL = 60  # seconds an unread-badge count is cached before it is recounted
+
 LOGIN_URL = "accounts:login"
 LOGIN_REDIRECT_URL = "home:index"
 LOGOUT_REDIRECT_URL = "home:index"